@@ -7,6 +7,7 @@ import inspect
 import dotenv
 import json as _json
 import os
+import time
 from discord.ext import commands
 from asyncio import TimeoutError
 from typing import Union, Optional
@@ -190,7 +191,8 @@ class Admin(core.Cog):
         await ctx.send(
             "Available database commands:\n"
             "`database [set|add] <table> <column> <user> <value>`\n"
-            "`database [fetch|exec] <sql>`"
+            "`database [fetch|exec] <sql>`\n"
+            "`database [polls|stats|cache]`"
         )
 
     @_database.command(
@@ -272,12 +274,93 @@ class Admin(core.Cog):
         _embed = discord.Embed(color=core.COLOR, timestamp=ctx.now)
         _embed.set_author(name="Database calls")
         _embed.description=f"Total: {len(_data):,}"
+        if ctx.db.write_behind:
+            _embed.description += f"\nWrites buffered: {ctx.db.writes_buffered:,} ({ctx.db.writes_saved:,} saved, {ctx.db.writes_dropped:,} dropped)"
         lines = [
-            f"[{buffer['method']}] {buffer['query'][:64]}"
+            f"[{buffer['method']}] `{util.prec_duration_strf(buffer['duration'])}` {buffer['query'][:64]}"
             for buffer in reversed(_data)
         ]
         await paginators.newline_paginate_via_field(ctx, _embed, lines, "Specific", footer="Page {page}")
 
+    @_database.command(
+        name="stats",
+        aliases=("latency", "slow"),
+        perms="Owner",
+        usage="[total|count|p50|p95|p99|rows|errors]",
+        description="View latency stats of each query, slowest overall first.",
+        hidden=True
+    )
+    async def _database_stats(self, ctx, sort="total"):
+        if sort not in ("total", "count", "mean", "p50", "p95", "p99", "max", "rows", "errors"):
+            return await ctx.send("Invalid sort key.")
+
+        _stats = ctx.db.query_stats(sort=sort)
+        _embed = discord.Embed(color=core.COLOR, timestamp=ctx.now)
+        _embed.set_author(name="Database query stats")
+        _embed.description = f"{len(_stats):,} queries, sorted by {sort}"
+        lines = [
+            f"**{stat['count']:,}x** `{stat['query'][:64]}`\n"
+            f"p50 {util.prec_duration_strf(stat['p50'])} / p95 {util.prec_duration_strf(stat['p95'])} / "
+            f"p99 {util.prec_duration_strf(stat['p99'])} — {stat['rows']:,} rows, {stat['errors']:,} errors"
+            for stat in _stats
+        ]
+        await paginators.newline_paginate_via_field(ctx, _embed, lines or ["Nothing recorded yet."], "Queries",
+                                                    per_page=5, footer="Page {page}")
+
+    @_database.command(
+        name="cache",
+        perms="Owner",
+        description="View cache usage of each table.",
+        hidden=True
+    )
+    async def _database_cache(self, ctx):
+        _embed = discord.Embed(color=core.COLOR, timestamp=ctx.now)
+        _embed.set_author(name="Database cache")
+        for table, stats in ctx.db.cache_stats().items():
+            _lookups = stats['hits'] + stats['misses']
+            _ratio = stats['hits'] / _lookups if _lookups else 0
+            _embed.add_field(name=table, value=(
+                f"Entries: {stats['entries']:,} (~{stats['bytes']/1024:,.1f} KiB)\n"
+                f"Hits: {stats['hits']:,} / Misses: {stats['misses']:,} ({_ratio*100:.1f}%)\n"
+                f"Evictions: {stats['evictions']:,} / Expirations: {stats['expirations']:,}"
+            ))
+        if not _embed.fields:
+            _embed.description = "Nothing is cached yet."
+        await ctx.send(_embed)
+
+    @core.command(
+        name="error",
+        aliases=("err", "errors"),
+        perms="Owner",
+        description="Look up an error by its reference ID, or view the most recent ones.",
+        usage="error [reference]",
+        hidden=True
+    )
+    async def _error(self, ctx, reference=None):
+        _errors = ctx.bot.handler.errors
+        _embed = discord.Embed(color=core.COLOR, timestamp=ctx.now)
+        if reference is None:
+            _embed.set_author(name="Recent errors")
+            _embed.description = "\n".join(
+                f"`{report.id}` **{report.type}** x{report.count:,}"
+                for report in list(reversed(_errors.reports.values()))[:15]
+            ) or "No errors so far."
+            _embed.set_footer(text=f"{_errors.dropped:,} uploads dropped")
+            return await ctx.send(_embed)
+
+        if not (report := _errors.get(reference)):
+            return await ctx.send("No error with that reference ID.")
+
+        _embed.set_author(name=f"Error {report.id}")
+        _embed.description = util.escape_markdown(f"{report.type}: {report.message}"[:1800])
+        _embed.add_field(name="Occurrences", value=(
+            f"{report.count:,}\n"
+            f"First: {util.duration_strf(round(time.time()-report.first_seen))} ago\n"
+            f"Last: {util.duration_strf(round(time.time()-report.last_seen))} ago"
+        ))
+        _embed.add_field(name="Traceback", value=report.url or "Not uploaded (yet)")
+        await ctx.send(_embed)
+
     @core.command(
         name="upload",
         alias="up",
@@ -376,8 +459,8 @@ class Admin(core.Cog):
         await _.add_reaction(core.SHRIMP)
 
         try:
-            __, winner = await ctx.bot.wait_for("reaction_add", timeout=30, check=lambda r, u: (
-                r.message == _ and not u.bot and str(r.emoji) == core.SHRIMP
+            __, winner = await ctx.bot.router.wait_for_reaction(_.id, timeout=30, check=lambda r, u: (
+                not u.bot and str(r.emoji) == core.SHRIMP
             ))
         except TimeoutError:
             return await ctx.maybe_edit(_, content="I timed-out.")
@@ -416,7 +499,12 @@ class Admin(core.Cog):
 
     @commands.Cog.listener()
     async def on_unblacklist_timer_complete(self, timer):
-        await self.client.dm(timer.kwargs.get("user"), "Your blacklist is over; you may use the bot normally now.")
+        user_id = timer.kwargs.get("user_id", timer.kwargs.get("user"))  # Older timers stored it as "user"
+        if not isinstance(user_id, int):
+            return
+        self.client.db.expire_blacklist(user_id, self.client.unix)
+        if user := await self.client.getch_user(user_id):
+            await self.client.dm(user, "Your blacklist is over; you may use the bot normally now.")
 
     @core.command(
         name="blacklist",
@@ -431,12 +519,7 @@ class Admin(core.Cog):
             return await ctx.send("That user is already blacklisted.")
 
         new_time = ctx.unix + duration if duration else 1
-        query = """
-        INSERT INTO blacklists (user_id, moderator_id, expires, reason)
-        VALUES ($1, $2, $3, $4) ON CONFLICT (user_id) DO UPDATE SET
-        user_id=$1, moderator_id=$2, expires=$3, reason=$4;
-        """
-        await ctx.db.execute(query, user.id, ctx.author.id, new_time, reason)
+        await ctx.db.add_blacklist(user, ctx.author, new_time, reason)
         try:
             await ctx.message.add_reaction("✅")
         except discord.Forbidden:
@@ -447,20 +530,26 @@ class Admin(core.Cog):
                                f"You have been blacklisted from ShrimpMaster for **{util.duration_strf(duration)}**. Reason: {reason}")
         if duration:
             await ctx.bot.create_relative_timer(
-                duration, "unblacklist", user=user
+                duration, "unblacklist", user_id=user.id, owner_id=user.id
             )
 
     @core.command(
         name="unblacklist",
         alias="ubl",
         perms="Owner",
-        description="Unblacklists a user from the bot.",
+        description="Unblacklists one or more users from the bot.",
+        usage="unblacklist <...users>",
         hidden=True
     )
-    async def _unblacklist(self, ctx, *, user: converters.BetterUserConverter()):
-        await ctx.db.execute("DELETE FROM blacklists WHERE user_id=$1", user.id)
-        await ctx.send(f"Unblacklisted **{user.name}**.")
-        await ctx.bot.dm(user, f"You have been manually unblacklisted by a bot moderator.")
+    async def _unblacklist(self, ctx, users: commands.Greedy[converters.BetterUserConverter()]):
+        if not users:
+            return await ctx.send("Please give me users to unblacklist.")
+
+        await ctx.db.remove_blacklist(*users)
+        await ctx.bot.timers.cancel_timers(event="unblacklist", owner_id=[user.id for user in users])
+        await ctx.send(f"Unblacklisted {', '.join(f'**{user.name}**' for user in users)}.")
+        for user in users:
+            await ctx.bot.dm(user, f"You have been manually unblacklisted by a bot moderator.")
 
     @core.command(
         name="eval",
@@ -14,7 +14,7 @@ class Config(core.Cog):
         invoke_without_command=True
     )
     async def _shortcuts(self, ctx):
-        shortcuts = await ctx.db.fetch("SELECT * FROM shortcuts WHERE user_id=$1", ctx.author.id)
+        shortcuts = list(await ctx.db.get_shortcuts(ctx.author))
         fields = ([{
             "name": shortcut["name"],
             "value": shortcut["command"][:1024],
@@ -49,15 +49,32 @@ class Config(core.Cog):
             return await ctx.send("Shortcut name is required.")
         if ctx.bot.get_command(shortcut):
             return await ctx.send("Shortcut name must not be the name of an existing command.")
-        shortcuts = ctx.db.shortcut_cache.get(ctx.author.id, [])
+        shortcuts = await ctx.db.get_shortcuts(ctx.author)
         if len(shortcuts) >= core.MAX_SHORTCUTS:
             return await ctx.send(f"You can only have up to **{core.MAX_SHORTCUTS:,}** shortcuts.")
-        if any(sc["name"] == shortcut for sc in shortcuts):
+        if shortcut in shortcuts.exact:
             return await ctx.send("A shortcut with that name already exists.")
 
         await ctx.db.add_shortcut(ctx.author, shortcut, command)
         await ctx.send(f"Shortcut `{shortcut}` created.")
 
+    @_shortcuts.command(
+        name="remove",
+        aliases=("delete", "del", "rm", "-"),
+        cooldown=(2, 1),
+        description="Remove one of your shortcuts.",
+        usage="<shortcut>",
+        examples=(
+            "shortcuts remove coffee",
+            "shortcuts remove \"some shortcut\""
+        )
+    )
+    async def _shortcuts_remove(self, ctx, *, shortcut):
+        shortcut = shortcut.strip().strip('"').lower()
+        if not await ctx.db.remove_shortcut(ctx.author, shortcut):
+            return await ctx.send("You don't have a shortcut with that name.")
+        await ctx.send(f"Shortcut `{shortcut}` removed.")
+
 
     @core.group(
         name="prefix",
@@ -4,6 +4,7 @@ from discord.ext.commands import max_concurrency, BucketType
 from util import converters
 from util.util import progress_bar, duration_strf, random
 from typing import Optional
+from random import getrandbits
 
 
 max_con = max_concurrency(1, BucketType.user)
@@ -84,8 +85,12 @@ class Factories(core.Cog):
         if await ctx.confirm(f"Would you like to start your factory for **{core.SHRIMP} 1,000 shrimp**?", timeout=30):
             await ctx.cd()
             await ctx.db.add("users", "shrimp", ctx.author, -1000)
-            await ctx.db.set("factories", "is_active", ctx.author, True)
-            await ctx.db.set("factories", "last_claim", ctx.author, ctx.unix)
+            await ctx.db.set_many("factories", ctx.author, {
+                "is_active": True,
+                "last_claim": ctx.unix,
+                "golden_rolled_at": ctx.unix,
+                "golden_seed": getrandbits(63)
+            })
             await ctx.send(f"All set! You can view stats on your factory using **{ctx.clean_prefix}factory**.")
 
         else:
@@ -1,7 +1,9 @@
 import os
 import core
 import discord
-from discord.ext import commands
+from random import random
+from collections import deque
+from discord.ext import commands, tasks
 from functools import partial
 
 
@@ -15,12 +17,30 @@ class Channels:
                  691089753680117792)
 
 
+class CommandLog:
+    FLUSH_INTERVAL = 2
+    BATCH_SIZE = 10  # Most embeds a webhook message can have
+    BATCH_CHARACTERS = 5800  # Discord rejects messages whose embeds add up to over 6000 characters
+    MAX_CONTENT = 1000  # Characters of the message content kept in a log
+    MAX_CALLS = 4  # Webhook calls per flush, to stay clear of the rate limit
+    MAX_QUEUED = 500
+    SAMPLE_AT = 100  # Past this many queued logs, only some new ones are kept
+
+
 class Logging(core.Cog):
 
     def __init__(self, bot):
         super().__init__(bot)
         self.getch_channel = partial(bot.getch, bot.get_channel, bot.fetch_channel)
 
+        self.webhook = None
+        if webhook_url := os.getenv('COMMAND_LOG_WEBHOOK_URL'):
+            self.webhook = discord.Webhook.from_url(webhook_url, adapter=discord.AsyncWebhookAdapter(bot.session))
+        self.log_queue = deque()
+        self.log_stats = dict.fromkeys(("seen", "sent", "calls", "dropped", "sampled_out", "failed"), 0)
+        if self.webhook is not None:
+            self._ship_logs.start()
+
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
         if payload.user_id not in Channels.WHITELIST:
@@ -129,11 +149,20 @@ class Logging(core.Cog):
 
     @commands.Cog.listener()
     async def on_command(self, ctx):
-        webhook_url = os.environ['COMMAND_LOG_WEBHOOK_URL']
-        webhook = discord.Webhook.from_url(webhook_url, adapter=discord.AsyncWebhookAdapter(self.client.session))
+        if self.webhook is None:
+            return
+
+        self.log_stats["seen"] += 1
+        if len(self.log_queue) >= CommandLog.MAX_QUEUED:
+            self.log_stats["dropped"] += 1
+            return
+        if len(self.log_queue) >= CommandLog.SAMPLE_AT and random() * len(self.log_queue) >= CommandLog.SAMPLE_AT:
+            self.log_stats["sampled_out"] += 1  # Keep fewer of them the further behind we are
+            return
 
         embed = discord.Embed(color=core.COLOR, timestamp=self.client.now)
-        embed.description = ctx.message.content
+        _content = ctx.message.content
+        embed.description = _content if len(_content) <= CommandLog.MAX_CONTENT else _content[:CommandLog.MAX_CONTENT-1] + "…"
         embed.set_author(name=ctx.author, icon_url=ctx.avatar)
         embed.add_field(name="Author", value=(
             f"{ctx.author}\n"
@@ -148,11 +177,36 @@ class Logging(core.Cog):
                 f"{ctx.guild.name}\n"
                 f"ID: {ctx.guild.id}"
             ))
+        embed.add_field(name="Message", value=f"[Jump!]({ctx.message.jump_url})", inline=False)
 
         embed.set_footer(text=f"Message ID: {ctx.message.id}")
-        jump_embed = discord.Embed(color=core.EMBED_COLOR, description=f"[Jump!]({ctx.message.jump_url})")
-
-        await webhook.send(embeds=(embed, jump_embed))
+        self.log_queue.append(embed)
+
+    @tasks.loop(seconds=CommandLog.FLUSH_INTERVAL)
+    async def _ship_logs(self):
+        """ Sends queued command logs, up to 10 embeds (and 6000 characters) per webhook call """
+        for _ in range(CommandLog.MAX_CALLS):
+            if not self.log_queue:
+                return
+
+            batch = [self.log_queue.popleft()]
+            _characters = len(batch[0])
+            while (
+                self.log_queue and len(batch) < CommandLog.BATCH_SIZE
+                and _characters + len(self.log_queue[0]) <= CommandLog.BATCH_CHARACTERS
+            ):
+                _characters += len(self.log_queue[0])
+                batch.append(self.log_queue.popleft())
+            try:
+                await self.webhook.send(embeds=batch)
+            except discord.HTTPException:
+                self.log_stats["failed"] += len(batch)
+            else:
+                self.log_stats["sent"] += len(batch)
+                self.log_stats["calls"] += 1
+
+    def cog_unload(self):
+        self._ship_logs.cancel()
 
 
 def setup(client):
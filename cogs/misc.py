@@ -3,7 +3,8 @@ from PIL import Image
 import core
 import time
 import discord
-from util import util, paginators, graphs
+from typing import Optional
+from util import util, paginators, graphs, converters
 
 
 class Misc(core.Cog):
@@ -120,21 +121,24 @@ class Misc(core.Cog):
     @core.command(
         name="commandusage",
         aliases=("cmdusage", "cu"),
-        description="View how frequently my commands are used.",
+        description="View how frequently my commands are used, optionally only within a recent period of time.",
+        usage="commandusage [period]",
+        examples=("commandusage", "commandusage 1h", "commandusage 7d"),
         cooldown=5
     )
-    async def _commandusage(self, ctx):
+    async def _commandusage(self, ctx, period: Optional[converters.TimeConverter] = None):
         await ctx.cd()
 
+        usage = await ctx.db.usage.usage(since=ctx.unix-period if period else None)
         lines = [
-            f"**{command}**  -  {usage:,}"
-            for command, usage in sorted(ctx.bot.command_usage.items(), key=lambda i: i[1], reverse=True)
+            f"**{command}**  -  {uses:,}"
+            for command, uses in usage
         ]
 
         _embed = discord.Embed(color=core.COLOR, timestamp=ctx.now)
         _embed.title = "Command Usage"
-        _embed.description = "Command usage since my last startup."
-        _embed.description += f"\nTotal: **{ctx.bot.handler.commands_handled:,}**"
+        _embed.description = f"Command usage over the last {util.duration_strf(period)}." if period else "Command usage of all time."
+        _embed.description += f"\nTotal: **{sum(uses for _, uses in usage):,}**"
         await paginators.newline_paginate_via_field(ctx, _embed, lines, "Breakdown", footer="Page {page}")
 
 
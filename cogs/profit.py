@@ -230,7 +230,7 @@ class Profit(core.Cog):
                     f"({core.SHRIMP} {round(amount * _multiplier):,} shrimp)"
                 ), inline=False)
                 embed.add_field(name="Total Return", value=f"{core.SHRIMP} {round(amount * (1 + _multiplier)):,} shrimp")
-                await ctx.maybe_edit(_, content="", embed=embed, allowed_mentions=discord.AllowedMentions.none())
+                ctx.queue_edit(_, content="", embed=embed, allowed_mentions=discord.AllowedMentions.none())
             else:
                 embed = _embed(core.RED)
                 embed.description = "You failed to invest your shrimp properly."
@@ -279,9 +279,8 @@ class Profit(core.Cog):
 
         while True:
             try:
-                _response = await ctx.bot.wait_for("message", timeout=20, check=lambda msg: (
-                    msg.author.id == ctx.author.id and msg.channel.id == ctx.channel.id
-                    and msg.content.lower() in ("leave", "l", "dive", "d")
+                _response = await ctx.bot.router.wait_for_message(ctx.channel.id, ctx.author.id, timeout=20, check=lambda msg: (
+                    msg.content.lower() in ("leave", "l", "dive", "d")
                 ))
             except asyncio.TimeoutError:
                 await ctx.cd()
@@ -357,7 +356,7 @@ class Profit(core.Cog):
 
                 await ctx.db.add("items", _chosen.id, ctx.author, 1)
                 if not _no_edit:
-                    await ctx.maybe_edit(_, "", embed=_embed, allowed_mentions=_no_mention)
+                    ctx.queue_edit(_, "", embed=_embed, allowed_mentions=_no_mention)
                     await asyncio.sleep(util.random(1., 1.3))
 
         _embed.colour = core.GREEN if collected else core.RED
@@ -439,8 +438,12 @@ class Profit(core.Cog):
 
         if await ctx.db.get("users", user, "locked"):
             fine = max(250, round(util.random(.3, .75)*_author_shrimp))
-            await ctx.db.set("users", "locked", user, False)
-            await ctx.db.add("users", "shrimp", ctx.author, -fine)
+            await (
+                ctx.db.transaction()
+                .set("users", "locked", user, False)
+                .add("users", "shrimp", ctx.author, -fine)
+                .commit()
+            )
             await ctx.db.notify(user, "Someone tried to rob you!", f"**{ctx.author.name}** ({ctx.author.mention}) tried to rob you in **{ctx.guild.name}**, but you had a padlock active.")
             return await ctx.send(f"That user has a lock active. Your rob failed and you lost {core.SHRIMP} **{fine:,} shrimp**.")
 
@@ -451,16 +454,26 @@ class Profit(core.Cog):
             _percent = util.random(.2, .7)
             if shield_active: _percent /= 2
             _amount = int(_user_shrimp*_percent)
-            await ctx.db.add("users", "shrimp", ctx.author, _amount)
-            await ctx.db.add("users", "shrimp", user, -_amount)
-            await ctx.db.notify(user, "You have been robbed!", f"**{ctx.author.name}** ({ctx.author.mention}) robbed {core.SHRIMP} **{_amount:,}** from you in **{ctx.guild.name}**!")
-            message = f"You stole {core.SHRIMP} **{_amount:,} shrimp** ({round(_percent*100)}%) from **{user.name}**. Too bad for them."
+            if await (
+                ctx.db.transaction()
+                .add("users", "shrimp", user, -_amount, minimum=0)
+                .add("users", "shrimp", ctx.author, _amount)
+                .commit()
+            ):
+                await ctx.db.notify(user, "You have been robbed!", f"**{ctx.author.name}** ({ctx.author.mention}) robbed {core.SHRIMP} **{_amount:,}** from you in **{ctx.guild.name}**!")
+                message = f"You stole {core.SHRIMP} **{_amount:,} shrimp** ({round(_percent*100)}%) from **{user.name}**. Too bad for them."
+            else:
+                message = f"**{user.name}** spent their shrimp before you could grab it. Your rob failed."
 
         else:
             _percent = util.random(.2, .65)
             _fine = int(_author_shrimp*_percent)
-            await ctx.db.add("users", "shrimp", ctx.author, -_fine)
-            await ctx.db.add("users", "shrimp", user, _fine)
+            await (
+                ctx.db.transaction()
+                .add("users", "shrimp", ctx.author, -_fine)
+                .add("users", "shrimp", user, _fine)
+                .commit()
+            )
             await ctx.db.notify(user, "Someone tried to rob you!", f"**{ctx.author.name}** ({ctx.author.mention}) tried to rob you in **{ctx.guild.name}**, but got caught.")
             message = f"You were caught trying to steal shrimp from {user.name} and paid {core.SHRIMP} **{_fine:,} shrimp** to them. Lmao."
 
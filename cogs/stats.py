@@ -1,5 +1,6 @@
 import math
 import core
+import asyncio
 import typing
 import discord
 from discord.ext import flags
@@ -58,7 +59,7 @@ class Stats(core.Cog):
                 f"{_until_full}\n{util.progress_bar(**core.PROGRESS_BAR, ratio=_percent, length=7)}"
             ))
 
-        rank = await util.get_shrimp_ranking(ctx.bot.db.pool, user)
+        rank = await util.get_shrimp_ranking(ctx.bot.db, user)
         embed.set_thumbnail(url=user.avatar_url)
         embed.set_footer(text=rank)
         embed.timestamp = ctx.now
@@ -134,31 +135,33 @@ class Stats(core.Cog):
         __v = options.get("vault", options.get("v")) or False
         __p = options.get("pocket", options.get("p")) or False
 
-        _q = (
-            "select user_id, shrimp total from users where shrimp > 0 order by total desc" if __p else
-            "select user_id, vault total from users where vault > 0 order by total desc" if __v else
-            "select user_id, shrimp + vault total from users where shrimp + vault > 0 order by total desc"
-        )
+        _total = "shrimp" if __p else "vault" if __v else "shrimp + vault"
 
         _global = options.get("global", options.get("g")) or False
         _large = options.get("large", options.get("l")) or False
-        _global_data = await ctx.bot.db.fetch(_q)
+        _args = []
+        _q = f"select user_id, {_total} total, count(*) over () count from users where {_total} > 0"
         if not _global:
-            _guild_ids = [_.id for _ in ctx.guild.members if not _.bot]
-            data = [_ for _ in _global_data if _["user_id"] in _guild_ids]
-        else:
-            data = _global_data
-
-        lines = []
-        for i, info in enumerate(data, start=1):
-            _user = await ctx.bot.getch_user(info["user_id"])
-            if _user is not None:
-                _user = util.escape_markdown(str(_user))
-            if info["user_id"] == ctx.author.id:
-                lines.append(f"**{i}.**  {core.SHRIMP} **{info['total']:,}** ➜ **{_user}**")
-                continue
-
-            lines.append(f"**{i}.**  {core.SHRIMP} **{info['total']:,}** ➜ {_user}")
+            _args.append([_.id for _ in ctx.guild.members if not _.bot])
+            _q += " and user_id = any($1::bigint[])"
+        _q += f" order by total desc, user_id limit ${len(_args)+1} offset ${len(_args)+2}"
+
+        async def fetch_page(offset, limit):
+            data = await ctx.bot.db.fetch(_q, *_args, limit, offset)
+            if not data:
+                return ["Nobody has any shrimp yet."] if offset == 0 else [], offset
+
+            _users = await asyncio.gather(*(ctx.bot.getch_user(info["user_id"]) for info in data))
+            lines = []
+            for i, (info, _user) in enumerate(zip(data, _users), start=offset+1):
+                if _user is not None:
+                    _user = util.escape_markdown(str(_user))
+                if info["user_id"] == ctx.author.id:
+                    lines.append(f"**{i}.**  {core.SHRIMP} **{info['total']:,}** ➜ **{_user}**")
+                    continue
+
+                lines.append(f"**{i}.**  {core.SHRIMP} **{info['total']:,}** ➜ {_user}")
+            return lines, data[0]["count"]
 
         _author_name = "Global Shrimp Leaderboard" if _global else f"Shrimp Leaderboard for {ctx.guild.name}"
 
@@ -167,7 +170,7 @@ class Stats(core.Cog):
         embed.set_author(name=_author_name, icon_url=discord.Embed.Empty if _global else ctx.guild.icon_url)
 
         await ctx.bot.db.add_xp(ctx.author, 1)
-        await paginators.newline_paginate(ctx, embed, lines, per_page=per_page, footer="Page {page}")
+        await paginators.lazy_newline_paginate(ctx, embed, fetch_page, per_page=per_page, footer="Page {page}")
 
     @core.command(
         name="nets",
@@ -265,10 +268,11 @@ class Stats(core.Cog):
         cooldown=(10, 5)
     )
     async def _cooldowns(self, ctx):
+        _active = await ctx.db.get_cooldowns(ctx.author)
         cooldowns = [
             (
                 command.qualified_name,
-                await ctx.db.get_cooldown(command.qualified_name, ctx.author) - ctx.unix
+                _active.get(ctx.db.cooldowns.key(command.qualified_name), 0) - ctx.unix
             )
             for command in ctx.bot.commands
         ]
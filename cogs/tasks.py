@@ -1,27 +1,10 @@
 import core
-from discord import Object
 from discord.ext import tasks
 from util.util import random
 
 
 class Tasks(core.Cog):
 
-    def start_tasks(self):
-        self._factory.start()
-        #  self._stock.start()
-
-    @tasks.loop(minutes=1)
-    async def _factory(self):
-        """ This will add golden shrimp every minute or so """
-        if not self.client.db:
-            return
-
-        if factories := self.client.db.route("factories"):
-            for factory in factories.values():
-                if factory["is_active"] and factory["golden_shrimp"] < factory["golden_capacity"]:
-                    if random() < factory["golden_chance_per_minute"]:
-                        await self.client.db.add("factories", "golden_shrimp", Object(id=factory["user_id"]), 1)
-
     @tasks.loop(minutes=1)
     async def _stock(self):
         """ This will update the stocks graph """
@@ -44,6 +27,4 @@ class Tasks(core.Cog):
 
 
 def setup(client):
-    cog = Tasks(client)
-    client.add_cog(cog)
-    cog.start_tasks()
+    client.add_cog(Tasks(client))
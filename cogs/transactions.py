@@ -468,8 +468,13 @@ class Transactions(core.Cog):
 
         await ctx.cd()
         profit = item.sell * quantity
-        await ctx.db.add("items", item.id, ctx.author, -quantity)
-        await ctx.db.add("users", "shrimp", ctx.author, profit)
+        if not await (
+            ctx.db.transaction()
+            .add("items", item.id, ctx.author, -quantity, minimum=0)
+            .add("users", "shrimp", ctx.author, profit)
+            .commit()
+        ):
+            return await ctx.send("You don't have that many of that item anymore.")
 
         if quantity == 1:
             name = f"an " if any(item.name.startswith(vowel) for vowel in "aeiou") else "a "
@@ -504,19 +509,22 @@ class Transactions(core.Cog):
 
         total = 0
         lines = []
+        transaction = ctx.db.transaction()
         await ctx.cd()
-        for item in _items:
+        for item in dict.fromkeys(_items):
             quantity = await ctx.db.get("items", ctx.author, item.id)
             if quantity <= 0:
                 continue
             total += (sell_price := quantity * item.sell)
-            await ctx.db.set("items", item.id, ctx.author, 0)
+            transaction.add("items", item.id, ctx.author, -quantity, minimum=0)
             lines.append(f"Sold {item.quantitize(quantity)} for {core.SHRIMP} **{sell_price:,} shrimp**")
 
         if len(lines) <= 0:
             return await ctx.send("Out of the items you supplied, you had none of any of them.")
 
-        await ctx.db.add("users", "shrimp", ctx.author, total)
+        transaction.add("users", "shrimp", ctx.author, total)
+        if not await transaction.commit():
+            return await ctx.send("Your inventory changed while selling. Please try again.")
         _embed = discord.Embed(color=core.GREEN, timestamp=ctx.now)
         _embed.description = f"Total: {core.SHRIMP} **{total:,} shrimp**"
         _embed.set_author(name="Sold!", icon_url=ctx.avatar)
@@ -536,7 +544,8 @@ class Transactions(core.Cog):
         if command.name in ("daily", "weekly", "cooldowns"):
             return await ctx.send("You cannot reset the cooldown on that command.")
 
-        _cooldown = await ctx.db.get_cooldown(command.qualified_name, ctx.author)
+        _active = await ctx.db.get_cooldowns(ctx.author)
+        _cooldown = _active.get(ctx.db.cooldowns.key(command.qualified_name), 0)
         _retry_after = _cooldown - ctx.unix
 
         if _retry_after <= 0:
@@ -550,7 +559,7 @@ class Transactions(core.Cog):
         if await ctx.confirm(_message, delete_after=True, timeout=min(_retry_after, 30)):
             await ctx.cd()
             await ctx.db.add("users", "shrimp", ctx.author, -_price)
-            await ctx.db.set("cooldowns", command.qualified_name, ctx.author, 0)
+            await ctx.db.set_cooldown(command.qualified_name, ctx.author, 0)
             await ctx.send(f"Cooldown reset. (You paid {core.SHRIMP} **{_price:,}**)")
         else:
             await ctx.send("Cancelled.")
@@ -104,19 +104,49 @@ class Utility(core.Cog):
         else:
             await ctx.send(f'<{myst}>')
 
-    @core.command(
+    @core.group(
         name="remind",
-        aliases=("rm", "remindme", "reminder"),
+        aliases=("rm", "remindme", "reminder", "reminders"),
         description="Creates a reminder for you.",
-        usage="<when> [what]",
-        cooldown=(5, 2)
+        usage="<when> [what] | list | clear",
+        cooldown=(5, 2),
+        invoke_without_command=True
     )
     async def _remind(self, ctx, when: converters.TimeConverter, *, what):
         await ctx.bot.create_relative_timer(
-            when, "reminder", ctx.channel.id, ctx.author.id, what, ctx.message.jump_url
+            when, "reminder", ctx.channel.id, ctx.author.id, what, ctx.message.jump_url, owner_id=ctx.author.id
         )
         await ctx.send(f"{util.choice(('Alright', 'Okay', 'Sure thing'))}, in {util.duration_strf(when)}: {what}")
 
+    @_remind.command(
+        name="list",
+        aliases=("all", "view"),
+        description="View your pending reminders.",
+        cooldown=(3, 1)
+    )
+    async def _remind_list(self, ctx):
+        reminders = await ctx.bot.timers.get_timers(event="reminder", owner_id=ctx.author.id)
+        if not reminders:
+            return await ctx.send("You don't have any reminders.")
+
+        lines = [
+            f"**{util.duration_strf(round((timer.expires - ctx.now).total_seconds()))}**: {timer.args[2][:100]}"
+            for timer in reminders
+        ]
+        _embed = discord.Embed(color=core.COLOR, timestamp=ctx.now)
+        _embed.set_author(name=f"{ctx.author.name}'s Reminders", icon_url=ctx.avatar)
+        await paginators.newline_paginate(ctx, _embed, lines, footer="Page {page}")
+
+    @_remind.command(
+        name="clear",
+        aliases=("cancel", "wipe"),
+        description="Cancel all of your pending reminders.",
+        cooldown=(5, 2)
+    )
+    async def _remind_clear(self, ctx):
+        cancelled = await ctx.bot.timers.cancel_timers(event="reminder", owner_id=ctx.author.id)
+        await ctx.send(f"Cancelled {cancelled:,} reminder{'s' if cancelled != 1 else ''}.")
+
     @commands.Cog.listener()
     async def on_reminder_timer_complete(self, timer):
         channel_id, user_id, what, jump_url = timer.args
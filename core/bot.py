@@ -13,6 +13,10 @@ import platform
 from json import dumps
 from util.eval import EvalManager
 from util.timers import BotTimerManager
+from util.prefixes import PrefixMatcher
+from util.router import InteractionRouter
+from util.edits import EditCoalescer
+from util.names import NameDirectory
 from util.util import duration_strf
 from util.path import route
 from .help import ShrimpMasterHelpCommand
@@ -23,17 +27,11 @@ dotenv.load_dotenv()
 
 
 async def get_prefix(client, message):
-    fallback = os.urandom(32).hex()
+    # patterns are compiled once per guild, case insensitive
+    match = await client.prefixes.match(message)
 
-    _prefixes = await client.db.get("guilds", message.guild, "prefixes")
-    _prefixes = _prefixes or ["s."]
-
-    # regex compiling for case insensitivity
-    comp = re.compile("^(" + "|".join(map(re.escape, _prefixes)) + ").*", flags=re.I)
-    match = comp.match(message.content)
-
-    if match is not None: return match.group(1)
-    return commands.when_mentioned_or(fallback)(client, message)
+    if match is not None: return match
+    return commands.when_mentioned(client, message)
 
 
 class Gist:
@@ -56,8 +54,9 @@ class Gist:
 
 class Context(commands.Context):
     def __init__(self, **kwargs):
+        self.parsed = kwargs.pop("parsed", None)
         super().__init__(**kwargs)
-        self.suppress_reply = False
+        self.suppress_reply = self.parsed is not None and self.parsed.no_reply
         self.db = self.bot.db
 
     @property
@@ -142,12 +141,9 @@ class Context(commands.Context):
             await original.add_reaction(r_yes)
             await original.add_reaction(r_no)
 
-            try: response = str((await self.bot.wait_for(
-                "reaction_add", timeout=timeout, check=(
-                    lambda r, u: str(r.emoji) in r_all
-                    and r.message.id==original.id
-                    and u.id==self.author.id
-                )
+            try: response = str((await self.bot.router.wait_for_reaction(
+                original.id, self.author.id, timeout=timeout,
+                check=lambda r, u: str(r.emoji) in r_all
             ))[0].emoji)
 
             except asyncio.TimeoutError:
@@ -163,12 +159,9 @@ class Context(commands.Context):
             original = await self.send(text+"\nType `yes` or `no` in chat.")
             yes = ("yes", "y", "sure", "yeah")
 
-            try: response = (await self.bot.wait_for(
-                "message", timeout=timeout, check=(
-                    lambda msg: msg.content is not None
-                    and msg.author.id==self.author.id
-                    and msg.channel.id==self.channel.id
-                )
+            try: response = (await self.bot.router.wait_for_message(
+                self.channel.id, self.author.id, timeout=timeout,
+                check=lambda msg: msg.content is not None
             )).content.lower()
             except asyncio.TimeoutError:
                 return False
@@ -178,12 +171,18 @@ class Context(commands.Context):
 
     async def maybe_edit(self, message, content=None, **kwargs):
         try:
-            await message.edit(content=content, **kwargs)
+            await self.bot.edits.edit(message, content=content, **kwargs)
         except (AttributeError, discord.NotFound):
             if (not message) or message.channel == self.channel:
                 return await self.send(content, **kwargs)
             await message.channel.send(content, **kwargs)
 
+    def queue_edit(self, message, content=None, **kwargs):
+        """ Edits a message without waiting for it. Use this for progress updates, which may be skipped. """
+        future = self.bot.edits.edit(message, content=content, **kwargs)
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return future
+
     async def maybe_delete(self, message, *args, **kwargs):
         try:
             await message.delete(*args, **kwargs)
@@ -209,10 +208,16 @@ class ShrimpMaster(commands.Bot):
 
         self.db = None
         self.timers = None
+        self.prefixes = None
         self.evaluator = None
-        self.command_usage = {}
         self.up_since = datetime.datetime.utcnow()
         self.handler = handler.Handler()
+        self.router = InteractionRouter(self)
+        self.edits = EditCoalescer(self)
+        self.names = NameDirectory(self)
+        for _event in ("on_member_join", "on_member_update", "on_member_remove", "on_user_update", "on_guild_remove"):
+            self.add_listener(getattr(self.names, _event))
+        self.add_listener(self._route_message, "on_message")
         self.session = aiohttp.ClientSession()
         self.mystbin = mystbin.Client()
         self.gist = Gist(self.session)
@@ -241,8 +246,12 @@ class ShrimpMaster(commands.Bot):
             password=_database_password,
             host="127.0.0.1"
         )
-        self.db = database.DatabaseManager(_db, self)
+        self.db = database.DatabaseManager(_db, self, write_behind=bool(os.getenv("DB_WRITE_BEHIND")))
         await database.setup(_db)
+        await self.db.cooldowns.load()
+        await self.db.ranks.load()
+        await self.db.load_blacklist()
+        self.db.usage.start()
 
     def _setup_public_env(self):
         os.environ["NO_COLOR"] = "True"
@@ -279,6 +288,7 @@ class ShrimpMaster(commands.Bot):
     def _setup(self):
         self._setup_public_env()
         self.loop.run_until_complete(self._setup_database())
+        self.prefixes = PrefixMatcher(self.db)
         self.timers = BotTimerManager(self)
         self.evaluator = EvalManager(self)
         self._setup_custom_methods()
@@ -342,11 +352,6 @@ class ShrimpMaster(commands.Bot):
         else:
             return _result
 
-    def add_to_usage(self, name):
-        if name not in self.command_usage:
-            self.command_usage[name] = 0
-        self.command_usage[name] += 1
-
     @staticmethod
     async def dm(user, *args, **kwargs):
         try:
@@ -357,29 +362,6 @@ class ShrimpMaster(commands.Bot):
     async def process_commands(self, message):
         await self.handler.handle_command(self, message, Context)
 
-    async def wait_for_multiple(self, *events, **kwargs):
-        done, pending = await asyncio.wait([
-            self.wait_for(event, **kwargs)
-            for event in events
-        ], return_when=asyncio.FIRST_COMPLETED)
-
-        # noinspection PyBroadException
-        _result: any = None
-        _error:  any = None
-        try:
-            _result = done.pop().result()
-        except Exception as e:
-            _error = e
-
-        for future in done:
-            future.exception()
-        for future in pending:
-            future.cancel()
-
-        if _error is not None:
-            raise _error
-        return _result
-
     async def on_message(self, message):
         if message.author.bot:
             return
@@ -409,13 +391,35 @@ class ShrimpMaster(commands.Bot):
     async def on_command_error(self, ctx, error):
         await self.handler.handle_error(ctx, error)
 
+    async def _route_message(self, message):
+        # A listener of its own, since edited messages are also passed to on_message
+        if not message.author.bot:
+            self.router.dispatch_message(message)
+
+    async def on_reaction_add(self, reaction, user):
+        self.router.dispatch_reaction("reaction_add", reaction, user)
+
+    async def on_reaction_remove(self, reaction, user):
+        self.router.dispatch_reaction("reaction_remove", reaction, user)
+
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        self.router.dispatch_raw_reaction("raw_reaction_add", payload)
         if str(payload.emoji) == constants.TRASH and payload.user_id == self.owner_id:
             await self.http.delete_message(payload.channel_id, payload.message_id)
 
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        self.router.dispatch_raw_reaction("raw_reaction_remove", payload)
+
     async def send_message(self, channel_id, content, **kwargs):
         await self.http.send_message(channel_id, content, **kwargs)
 
+    async def close(self):
+        if self.timers:
+            await self.timers.close()
+        if self.db:
+            await self.db.close()
+        await super().close()
+
     def run(self):
         token = os.getenv("TOKEN")
         super().run(token)
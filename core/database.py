@@ -1,11 +1,28 @@
 import datetime
 import math
 
+import json
+import time
+import asyncio
 import asyncpg
 import typing
 import random
+import logging
+from functools import partial
 from core import constants
 from util import items
+from util.cache import TableCache
+from util.cooldowns import CooldownManager
+from util.ranking import RankIndex
+from util.metrics import QueryStats
+from util.shortcuts import ShortcutIndex
+from util.usage import CommandUsage
+from util.loops import run_every, log_failure
+
+log = logging.getLogger(__name__)
+
+# Errors after which writes are kept and retried, rather than blamed on the rows being written
+_CONNECTION_ERRORS = (OSError, asyncio.TimeoutError, asyncpg.PostgresConnectionError, asyncpg.ConnectionDoesNotExistError)
 
 
 async def setup(db):
@@ -51,9 +68,29 @@ async def setup(db):
         is_removal boolean not null default false,
         message_id bigint
     );
-    CREATE TABLE IF NOT EXISTS cooldowns (
-        user_id bigint unique
+    CREATE TABLE IF NOT EXISTS command_cooldowns (
+        user_id bigint not null,
+        command text not null,
+        expires double precision not null default 0,
+        primary key (user_id, command)
+    );
+    CREATE TABLE IF NOT EXISTS command_usage (
+        bucket bigint not null,
+        command text not null,
+        guild_id bigint not null default 0,
+        uses bigint not null default 0,
+        primary key (bucket, command, guild_id)
     );
+    CREATE TABLE IF NOT EXISTS command_usage_totals (
+        command text not null,
+        guild_id bigint not null default 0,
+        uses bigint not null default 0,
+        primary key (command, guild_id)
+    );
+    INSERT INTO command_usage_totals (command, guild_id, uses)
+    SELECT command, guild_id, sum(uses) FROM command_usage
+    WHERE NOT EXISTS (SELECT 1 FROM command_usage_totals)
+    GROUP BY command, guild_id;
     CREATE TABLE IF NOT EXISTS items (
         user_id bigint unique
     );
@@ -68,12 +105,17 @@ async def setup(db):
         extra text not null default '{}',
         event text
     );
+    ALTER TABLE timers ADD COLUMN IF NOT EXISTS owner_id bigint;
+    CREATE INDEX IF NOT EXISTS timers_event_owner_id_idx ON timers (event, owner_id);
+    CREATE INDEX IF NOT EXISTS timers_expires_idx ON timers (expires);
+    UPDATE timers SET owner_id = (extra::jsonb->'args'->>1)::bigint WHERE event = 'reminder' AND owner_id IS NULL;
     CREATE TABLE IF NOT EXISTS shortcuts (
         user_id bigint,
         name text,
         aliases text[] not null default array[]::text[],
         command text
     );
+    CREATE INDEX IF NOT EXISTS shortcuts_user_id_idx ON shortcuts (user_id);
     CREATE TABLE IF NOT EXISTS factories (
         user_id bigint,
         is_active boolean not null default false,
@@ -88,6 +130,8 @@ async def setup(db):
         gcpm_upgrade_price bigint not null default 3000,
         golden_capacity_upgrade_price bigint not null default 5000
     );
+    ALTER TABLE factories ADD COLUMN IF NOT EXISTS golden_rolled_at double precision not null default 0;
+    ALTER TABLE factories ADD COLUMN IF NOT EXISTS golden_seed bigint not null default 0;
     CREATE TABLE IF NOT EXISTS notifications (
         user_id bigint,
         brief text not null default 'Unknown',
@@ -128,22 +172,80 @@ async def setup(db):
 
 
 class DatabaseManager:
-    def __init__(self, db, bot):
-        self._shortcuts_loaded = False
-        self.shortcut_cache = {}
-        self.cache = {}
-        self.calls = []
+    def __init__(self, db, bot, *, write_behind=False, flush_interval=2, flush_threshold=500,
+                 cache_size=10000, cache_bytes=None, cache_ttl=3600, cache_limits=None):
+        self.shortcut_cache = TableCache("shortcuts", max_entries=cache_size, ttl=cache_ttl)  # user_id -> ShortcutIndex
+        self.blacklist = {}  # user_id -> expires
+        self.cache = {}  # table -> TableCache
+        self.cache_limits = cache_limits or {}
+        self.default_cache_limits = {
+            "max_entries": cache_size,
+            "max_bytes": cache_bytes,
+            "ttl": cache_ttl
+        }
+        self.queries = QueryStats()
+        self.float_columns = {}  # table -> columns, see _float_columns
+        self.absent_rows = TableCache("absent", max_entries=cache_size, ttl=cache_ttl)  # (table, id) -> True, see warm
+        self.calls = self.queries.recent
         self.pool = db
         self.bot = bot
+        self.cooldowns = CooldownManager(self)
+        self.usage = CommandUsage(self)
+        self.ranks = RankIndex(self)
+
+        # Write-behind: the cache is authoritative, and updates from add/set
+        # are merged per (table, id, column) then flushed in bulk.
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.writes_buffered = 0
+        self.writes_saved = 0
+        self.writes_dropped = 0
+        self._pending = {}
+        self._inflight = set()  # Keys of the pending entries a flush is writing right now
+        self._pending_writes = 0
+        self._flush_lock = asyncio.Lock()
+        self._threshold_flush = None
+        self._flush_task = bot.loop.create_task(
+            run_every(flush_interval, self.flush, name="Write-behind flush")
+        ) if write_behind else None
+
+    def get_table_cache(self, table):
+        """ Gets the cache of a table, creating it with its configured limits if needed. """
+        if (_cache := self.cache.get(table)) is None:
+            _limits = {**self.default_cache_limits, **self.cache_limits.get(table, {})}
+            _cache = self.cache[table] = TableCache(
+                table, can_evict=lambda _id: not self._has_pending(table, _id), **_limits
+            )
+        return _cache
+
+    def cache_stats(self):
+        return {table: _cache.stats() for table, _cache in self.cache.items()}
 
     def update_cache(self, table, _id, column, new):
-        self.cache.update({table: self.route(table) or {}})
-        self.cache[table].update({_id: self.route(table, _id) or {}})
-        self.cache[table][_id][column] = new
+        _cache = self.get_table_cache(table)
+        _row = _cache.peek(_id) or {}
+        _row[column] = new
+        _cache[_id] = _row
+        self._track_rank(table, _id, column)
 
     def overwrite_cache_entry(self, table, _id, new):
-        self.cache.update({table: self.route(table) or {}})
-        self.cache[table].update({_id: new})
+        self.get_table_cache(table)[_id] = new
+        self.absent_rows.pop((table, _id), None)
+        self._track_rank(table, _id)
+
+    def _track_rank(self, table, _id, column=None):
+        """ Keeps the rank index in line with cached shrimp and vault balances. """
+        if table != "users" or column not in (None, "shrimp", "vault"):
+            return
+        _row = self.cache["users"].peek(_id)
+        if _row and "shrimp" in _row and "vault" in _row:
+            self.ranks.update(_id, _row["shrimp"] + _row["vault"])
+
+    def _invalidate_prefixes(self, table, _id, column):
+        """ Drops the compiled prefix pattern of a guild whose prefixes were written. """
+        if table == "guilds" and column == "prefixes" and (_prefixes := getattr(self.bot, "prefixes", None)):
+            _prefixes.invalidate(_id)
 
     def route(self, *directions):
         """ Take a tuple like ('guilds', 1234, 'prefixes') and
@@ -157,49 +259,140 @@ class DatabaseManager:
 
         return final or None
 
+    async def _call(self, method, query, *args, connection=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = await getattr(connection or self.pool, method.lower())(query, *args, **kwargs)
+        except Exception:
+            self.queries.record(method, query, time.perf_counter() - start, error=True)
+            raise
+
+        if method == "FETCH":
+            rows = len(result)
+        elif method in ("FETCHROW", "FETCHVAL"):
+            rows = int(result is not None)
+        else:
+            # Status strings look like "UPDATE 3" or "INSERT 0 1"
+            rows = int(_count) if (_count := str(result).rpartition(" ")[2]).isdigit() else 0
+        self.queries.record(method, query, time.perf_counter() - start, rows=rows)
+        return result
+
     async def execute(self, query, *args, **kwargs):
-        self.calls.append({
-            "method": "EXECUTE",
-            "query": query
-        })
-        return await self.pool.execute(query, *args, **kwargs)
+        return await self._call("EXECUTE", query, *args, **kwargs)
 
     async def fetch(self, query, *args, **kwargs):
-        self.calls.append({
-            "method": "FETCH",
-            "query": query
-        })
-        return await self.pool.fetch(query, *args, **kwargs)
+        return await self._call("FETCH", query, *args, **kwargs)
 
     async def fetchrow(self, query, *args, **kwargs):
-        self.calls.append({
-            "method": "FETCHROW",
-            "query": query
-        })
-        return await self.pool.fetchrow(query, *args, **kwargs)
+        return await self._call("FETCHROW", query, *args, **kwargs)
 
-    async def fetch_data(self, table, user, column=None):
+    async def fetchval(self, query, *args, **kwargs):
+        return await self._call("FETCHVAL", query, *args, **kwargs)
+
+    def query_stats(self, *, limit=None, sort="total"):
+        """ Latency, row and error stats for each normalized query. See QueryStats.summary. """
+        return self.queries.summary(limit=limit, sort=sort)
+
+    @staticmethod
+    def _get_or_create_ctes(table, pointer):
+        """ CTEs that select a row, or insert a default one if it doesn't exist.
+            Rows are read from "existing" and "inserted".
+        """
+        return (
+            '"existing" AS (SELECT * FROM "{0}" WHERE "{1}_id"=$1::bigint), '
+            '"inserted" AS (INSERT INTO "{0}" ("{1}_id") SELECT $1::bigint '
+            'WHERE NOT EXISTS (SELECT 1 FROM "existing") ON CONFLICT DO NOTHING RETURNING *)'
+        ).format(table, pointer)
+
+    async def get_or_create(self, table, user):
+        """ Fetches the row of a user or guild, creating it first if needed, in one round-trip. """
         _pointer = "guild" if user.__class__.__name__ == "Guild" else "user"
+        query = 'WITH {0} SELECT * FROM "existing" UNION ALL SELECT * FROM "inserted" LIMIT 1'.format(
+            self._get_or_create_ctes(table, _pointer)
+        )
+        if got := await self.fetchrow(query, user.id):
+            return got
+
+        # A concurrent insert won the race; its row is visible now
+        return await self.fetchrow('SELECT * FROM "{0}" WHERE "{1}_id"=$1'.format(table, _pointer), user.id)
+
+    async def _float_columns(self, tables):
+        """ Floating point columns of these tables, which row_to_json gives back as ints when they're whole. """
+        if missing := [table for table in tables if table not in self.float_columns]:
+            _found = {table: set() for table in missing}
+            for record in await self.fetch(
+                "SELECT table_name, column_name FROM information_schema.columns "
+                "WHERE table_name = ANY($1::text[]) AND data_type IN ('double precision', 'real')", missing
+            ):
+                _found[record['table_name']].add(record['column_name'])
+            self.float_columns.update(_found)
+        return {table: self.float_columns[table] for table in tables}
+
+    async def warm(self, user, tables=("users", "items", "factories")):
+        """ Caches the existing rows of a user in several tables in one round-trip,
+            skipping tables where they're cached already. Rows that don't exist aren't created,
+            get/fetch_data still do that for the tables a command actually uses; until then
+            they're remembered as absent, so they aren't looked for again on every command.
 
-        get_query = 'SELECT * FROM "{0}" WHERE "{1}_id"=$1'.format(table, _pointer)
-        query = 'INSERT INTO "{0}" ("{1}_id") VALUES ($1) ON CONFLICT DO NOTHING'.format(table, _pointer)
-        got = await self.fetchrow(get_query, user.id)
+            :return: A dict of table -> row, for rows that exist
+        """
+        rows = {}
+        missing = []
+        for table in tables:
+            if (_row := self.get_table_cache(table).peek(user.id)) is not None:
+                rows[table] = _row
+            elif self.absent_rows.get((table, user.id)) is None:
+                missing.append(table)
+        if not missing:
+            return rows
+
+        _floats = await self._float_columns(missing)
+        _columns = ", ".join(
+            '(SELECT row_to_json(r)::text FROM "{0}" r WHERE "user_id"=$1) AS "{0}"'.format(table)
+            for table in missing
+        )
+        got = await self.fetchrow(f"SELECT {_columns}", user.id)
+
+        for table in missing:
+            if (_cached := self.get_table_cache(table).peek(user.id)) is not None:
+                rows[table] = _cached  # Cached while this was fetching, and may be newer
+                continue
+            if not got[table]:
+                self.absent_rows[table, user.id] = True
+                continue
+            _row = json.loads(got[table])
+            for column in _floats[table] & _row.keys():
+                _row[column] = float(_row[column])
+            self.overwrite_cache_entry(table, user.id, _row)
+            rows[table] = _row
+        return rows
 
-        if not got:
-            await self.execute(query, user.id)
-            got = await self.fetchrow(get_query, user.id)
-        if not column:
+    async def fetch_data(self, table, user, column=None):
+        got = await self.get_or_create(table, user)
+        if (_cached := self.get_table_cache(table).peek(user.id)) is None:
             # Update the cache because it clearly doesn't have it
             self.overwrite_cache_entry(table, user.id, dict(got))
-            return got
-        res = got[column]
-        self.update_cache(table, user.id, column, res)
-        return res
+            return got[column] if column else got
+
+        # Cached while this was fetching, or missing newer columns;
+        # the cached values may be ahead of the database, so only fill in the gaps
+        for _column, value in got.items():
+            if _column not in _cached:
+                self.update_cache(table, user.id, _column, value)
+        return _cached[column] if column else _cached
 
     async def get(self, table, user, column=None):
         if route := self.route(table, user.id, column):
             return route  # If it's already stored in the cache, get that instead
 
+        # Whole rows and falsy values (0, False, '') are still cache hits;
+        # with write-behind the database may be behind the cache, so don't re-read them.
+        if table in self.cache and (_row := self.cache[table].peek(user.id)):
+            if column is None:
+                return _row
+            if column in _row:
+                return _row[column]
+
         return await self.fetch_data(table, user, column)
 
 
@@ -214,20 +407,245 @@ class DatabaseManager:
     async def add(self, table, column, user, amount: typing.Union[int, float]):
         await self.get(table, user)
         _pointer = "user" if user.__class__.__name__ in ('User', 'Member', 'Object') else "guild"
-        query = 'UPDATE "{0}" SET "{1}"="{1}"+$1 WHERE "{2}_id"=$2'.format(table, column, _pointer)
         try:
             self.cache[table][user.id][column] += amount
         except KeyError:
             await self.fetch_data(table, user, column)  # Updates the cache
+            self.cache[table][user.id][column] += amount
+        self._track_rank(table, user.id, column)
+
+        if self.write_behind:
+            return self._buffer_write(table, _pointer, user.id, column, "+", amount)
+        query = 'UPDATE "{0}" SET "{1}"="{1}"+$1 WHERE "{2}_id"=$2'.format(table, column, _pointer)
         return await self.execute(query, amount, user.id)
 
     async def set(self, table, column, user, value):
         await self.get(table, user)
         _pointer = "user" if user.__class__.__name__ in ('User', 'Member', 'Object') else "guild"
-        query = 'UPDATE "{0}" SET "{1}"=$1 WHERE "{2}_id"=$2'.format(table, column, _pointer)
         self.cache[table][user.id][column] = value
+        self._track_rank(table, user.id, column)
+        self._invalidate_prefixes(table, user.id, column)
+
+        if self.write_behind:
+            return self._buffer_write(table, _pointer, user.id, column, "=", value)
+        query = 'UPDATE "{0}" SET "{1}"=$1 WHERE "{2}_id"=$2'.format(table, column, _pointer)
         return await self.execute(query, value, user.id)
 
+    async def add_many(self, table, user, amounts):
+        """ Like add, but for several columns at once, in one statement.
+
+            :param amounts: A dict of column -> amount to add
+        """
+        amounts = {column: amount for column, amount in amounts.items() if amount}
+        if not amounts:
+            return
+
+        await self.get(table, user)
+        _pointer = "user" if user.__class__.__name__ in ('User', 'Member', 'Object') else "guild"
+        for column in amounts:
+            if column not in self.cache[table][user.id]:
+                await self.fetch_data(table, user, column)  # Updates the cache
+
+        for column, amount in amounts.items():
+            self.cache[table][user.id][column] += amount
+            self._track_rank(table, user.id, column)
+
+        if self.write_behind:
+            for column, amount in amounts.items():
+                self._buffer_write(table, _pointer, user.id, column, "+", amount)
+            return
+        _assignments = ", ".join('"{0}"="{0}"+${1}'.format(column, i) for i, column in enumerate(amounts, start=1))
+        query = 'UPDATE "{0}" SET {1} WHERE "{2}_id"=${3}'.format(table, _assignments, _pointer, len(amounts)+1)
+        return await self.execute(query, *amounts.values(), user.id)
+
+    async def set_many(self, table, user, values):
+        """ Like set, but for several columns at once, in one statement.
+
+            :param values: A dict of column -> new value
+        """
+        if not values:
+            return
+
+        await self.get(table, user)
+        _pointer = "user" if user.__class__.__name__ in ('User', 'Member', 'Object') else "guild"
+        for column, value in values.items():
+            self.cache[table][user.id][column] = value
+            self._track_rank(table, user.id, column)
+            self._invalidate_prefixes(table, user.id, column)
+
+        if self.write_behind:
+            for column, value in values.items():
+                self._buffer_write(table, _pointer, user.id, column, "=", value)
+            return
+        _assignments = ", ".join('"{0}"=${1}'.format(column, i) for i, column in enumerate(values, start=1))
+        query = 'UPDATE "{0}" SET {1} WHERE "{2}_id"=${3}'.format(table, _assignments, _pointer, len(values)+1)
+        return await self.execute(query, *values.values(), user.id)
+
+    def transaction(self):
+        return Transaction(self)
+
+    def _apply_committed(self, table, _id, column, op, value):
+        """ Mirrors a committed write into the cache, if the row is cached. """
+        if table not in self.cache or (_row := self.cache[table].peek(_id)) is None:
+            return
+        if op == "+" and column in _row:
+            _row[column] += value
+        elif op == "=":
+            _row[column] = value
+        self._track_rank(table, _id, column)
+        self._invalidate_prefixes(table, _id, column)
+
+    # --- WRITE-BEHIND ---
+
+    @staticmethod
+    def _merge_write(entry, column, op, value):
+        """ Merges an operation into a pending entry.
+            "+" adds onto whatever is pending, "=" replaces it.
+        """
+        if op == "+" and column in entry:
+            _op, _value = entry[column]
+            entry[column] = (_op, _value + value)
+        else:
+            entry[column] = (op, value)
+
+    def _has_pending(self, table, _id):
+        """ Whether a row has writes that aren't in the database yet, buffered or being flushed. """
+        return any(
+            key in self._pending or key in self._inflight
+            for key in ((table, "user", _id), (table, "guild", _id))
+        )
+
+    def _discard_row(self, key):
+        """ Forgets a cached row whose writes were dropped, along with anything buffered for it since,
+            so that the next read gets it from the database again.
+        """
+        table, _, _id = key
+        if self._pending.pop(key, None) is not None:
+            self.writes_dropped += 1
+        if table in self.cache:
+            self.cache[table].pop(_id, None)
+
+    def _buffer_write(self, table, pointer, _id, column, op, value):
+        self._merge_write(self._pending.setdefault((table, pointer, _id), {}), column, op, value)
+        self._pending_writes += 1
+        self.writes_buffered += 1
+
+        if (
+            len(self._pending) >= self.flush_threshold and not self._flush_lock.locked()
+            and (self._threshold_flush is None or self._threshold_flush.done())
+        ):
+            self._threshold_flush = self.bot.loop.create_task(self.flush())
+            self._threshold_flush.add_done_callback(partial(log_failure, name="Write-behind flush"))
+
+    def _requeue(self, pending, writes):
+        """ Puts writes that didn't land back in front of anything buffered since. """
+        for key, columns in self._pending.items():
+            for column, (op, value) in columns.items():
+                self._merge_write(pending.setdefault(key, {}), column, op, value)
+        self._pending = pending
+        self._pending_writes += writes
+
+    async def _execute_group(self, conn, table, pointer, columns, rows):
+        _assignments = ", ".join(
+            '"{0}"="{0}"+${1}'.format(column, i) if op == "+" else '"{0}"=${1}'.format(column, i)
+            for i, (column, op) in enumerate(columns, start=1)
+        )
+        query = 'UPDATE "{0}" SET {1} WHERE "{2}_id"=${3}'.format(table, _assignments, pointer, len(columns)+1)
+        start = time.perf_counter()
+        try:
+            await conn.executemany(query, rows)
+        except Exception:
+            self.queries.record("EXECUTEMANY", query, time.perf_counter() - start, error=True)
+            raise
+        self.queries.record("EXECUTEMANY", query, time.perf_counter() - start, rows=len(rows))
+
+    async def flush(self):
+        """ Writes every pending delta to the database.
+            Entries updating the same set of columns share one executemany.
+
+            :return: The amount of statements sent
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, {}
+            _writes, self._pending_writes = self._pending_writes, 0
+            self._inflight = set(pending)  # Still pinned in the cache until they're committed
+            try:
+                return await self._flush_pending(pending, _writes)
+            finally:
+                self._inflight = set()
+
+    async def _flush_pending(self, pending, _writes):
+        groups = {}  # (table, pointer, ((column, op), ...)) -> {pending key: row}
+        for key, columns in pending.items():
+            _columns = sorted(columns.items())
+            group = (key[0], key[1], tuple((column, op) for column, (op, _) in _columns))
+            groups.setdefault(group, {})[key] = (*(value for _, (_, value) in _columns), key[2])
+
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    for group, rows in groups.items():
+                        await self._execute_group(conn, *group, list(rows.values()))
+        except _CONNECTION_ERRORS:
+            self._requeue(pending, _writes)
+            raise
+        except Exception:
+            return await self._flush_apart(groups, pending)
+
+        self.writes_saved += _writes - len(groups)
+        return len(groups)
+
+    async def _flush_apart(self, groups, pending):
+        """ Flushes each group on its own after the batch failed, then each row of a group that still fails.
+            Rows that fail by themselves are logged and dropped, so one bad write can't hold back the rest.
+        """
+        sent = 0
+        try:
+            async with self.pool.acquire() as conn:
+                for group, rows in groups.items():
+                    try:
+                        async with conn.transaction():
+                            await self._execute_group(conn, *group, list(rows.values()))
+                    except _CONNECTION_ERRORS:
+                        raise
+                    except Exception:
+                        pass
+                    else:
+                        sent += 1
+                        for key in rows:
+                            del pending[key]
+                        continue
+
+                    for key, row in rows.items():
+                        try:
+                            async with conn.transaction():
+                                await self._execute_group(conn, *group, [row])
+                        except _CONNECTION_ERRORS:
+                            raise
+                        except Exception:
+                            self.writes_dropped += 1
+                            self._discard_row(key)
+                            log.exception("Dropped write-behind update of %s (%s_id=%s): %r", key[0], key[1], key[2], row)
+                        else:
+                            sent += 1
+                        del pending[key]
+        except _CONNECTION_ERRORS:
+            self._requeue(pending, sum(map(len, pending.values())))
+            raise
+        return sent
+
+    async def close(self):
+        """ Stops the write-behind task and flushes anything still pending. """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        await self.cooldowns.close()
+        await self.usage.close()
+
     # --- HELPER METHODS ---
     """ These wrap around normal methods for ease of use. """
 
@@ -237,60 +655,57 @@ class DatabaseManager:
         await self.execute("INSERT INTO notifications (user_id, brief, description, dealt_at) VALUES ($1, $2, $3, $4)",
                            user.id, brief, description, unix)
 
-    async def load_shortcuts(self):
-        self._shortcuts_loaded = True
-        shortcuts = await self.fetch("SELECT * FROM shortcuts")
-        for entry in shortcuts:
-            self.shortcut_cache.update({entry['user_id']: self.shortcut_cache.get(entry['user_id'], [])})
-            self.shortcut_cache[entry['user_id']].append(dict(entry))
-        return self.shortcut_cache
+    async def get_shortcuts(self, user):
+        """ The shortcut index of a user, loaded the first time it's needed. """
+        if (index := self.shortcut_cache.get(user.id)) is None:
+            records = await self.fetch("SELECT * FROM shortcuts WHERE user_id=$1", user.id)
+            if (index := self.shortcut_cache.peek(user.id)) is None:
+                index = self.shortcut_cache[user.id] = ShortcutIndex(records)
+        return index
 
     async def get_shortcut(self, user, shortcut):
-        if not self._shortcuts_loaded:
-            await self.load_shortcuts()
-
-        shortcut = shortcut.lower()
-        for sc in self.shortcut_cache.get(user.id, []):
-            if (
-                sc["name"] == shortcut or
-                shortcut in sc["aliases"] or
-                shortcut.startswith(sc["name"]+' ') or
-                any(
-                    shortcut.startswith(alias+' ')
-                    for alias in sc["aliases"]
-                )
-            ):
-                return sc["command"]
-        return None
+        return (await self.get_shortcuts(user)).resolve(shortcut.lower())
 
     async def add_shortcut(self, user, shortcut, command):
-        self.shortcut_cache.update({user.id: self.shortcut_cache.get(user.id, [])})
-        self.shortcut_cache[user.id].append({
-            "name": shortcut,
-            "command": command,
-            "aliases": []
-        })
-
         await self.execute("INSERT INTO shortcuts (user_id, name, command) VALUES ($1, $2, $3);", user.id, shortcut, command)
 
+        # Not cached means the next lookup loads it from the table
+        if (index := self.shortcut_cache.peek(user.id)) is not None:
+            index.add({
+                "user_id": user.id,
+                "name": shortcut,
+                "command": command,
+                "aliases": []
+            })
+
+    async def remove_shortcut(self, user, shortcut):
+        """ Removes a shortcut by name. Returns whether it existed. """
+        status = await self.execute("DELETE FROM shortcuts WHERE user_id=$1 AND name=$2;", user.id, shortcut)
+        if (index := self.shortcut_cache.peek(user.id)) is not None:
+            index.remove(shortcut)
+        return not status.endswith(" 0")
+
     async def get_level(self, user):
         _ = await self.get("users", user)
         return _["level"], _["xp"]
 
     async def add_xp(self, user, xp):
         xp = math.ceil(xp * await self.get('users', user, "xp_multiplier"))
-        await self.add("users", "xp", user, xp)
-        await self.add("users", "vault_space", user, xp)
-        _level, _xp = await self.get_level(user)
-        _requirement = constants.LEVEL_FORMULA(_level)
-
-        if _xp > _requirement:
-            while _xp > _requirement:
-                await self.add("users", "xp", user, -_requirement)
-                await self.add("users", "level", user, 1)
-                _level, _xp = await self.get_level(user)
-                _requirement = constants.LEVEL_FORMULA(_level)
-                await self.process_level_up(user, _level)
+        _old_level, _old_xp = _level, _xp = await self.get_level(user)
+
+        # Work out every level gained up front, then write it all at once
+        _xp += xp
+        while _xp > (_requirement := constants.LEVEL_FORMULA(_level)):
+            _xp -= _requirement
+            _level += 1
+
+        await self.add_many("users", user, {
+            "xp": _xp - _old_xp,
+            "vault_space": xp,
+            "level": _level - _old_level
+        })
+        if _level > _old_level:
+            await self.process_level_up(user, _level)
 
         return _level, _xp
 
@@ -317,26 +732,14 @@ class DatabaseManager:
 
 
     async def set_cooldown(self, name, user, value):
-        name = name.replace(" ", "_").replace("-", "_")
-
-        await self.execute("create table if not exists cooldowns (user_id bigint not null default 0);")
-        await self.execute(f"alter table cooldowns add column if not exists \"{name}\" bigint not null default 0;")
-
-        await self.get("cooldowns", user)
-        await self.set("cooldowns", name, user, round((value-1500000000)*1000))
+        self.cooldowns.set(user.id, name, value)
 
     async def get_cooldown(self, name, user):
-        name = name.replace(" ", "_").replace("-", "_")
-        await self.execute("create table if not exists cooldowns (user_id bigint not null default 0);")
+        return self.cooldowns.get(user.id, name)
 
-        try:
-            res = await self.fetchrow(f"select user_id, cooldowns.{name} from cooldowns where user_id=$1", user.id)
-        except (asyncpg.UndefinedTableError, asyncpg.UndefinedColumnError):
-            return 0
-        else:
-            if not res:
-                return 0
-            return res.get(name, 0)/1000 + 1500000000
+    async def get_cooldowns(self, user):
+        """ All active cooldowns of a user, keyed by CooldownManager.key(command name). """
+        return self.cooldowns.get_all(user.id)
 
     async def get_blacklist_info(self, ctx):
         if blacklist := await self.fetchrow(f"select * from blacklists where user_id=$1", ctx.author.id):
@@ -349,10 +752,36 @@ class DatabaseManager:
             }
         return None
 
+    async def load_blacklist(self):
+        """ Loads every blacklist that is still in effect. An expiry of 1 means forever. """
+        now = int(self.bot.unix)
+        self.blacklist = {
+            record["user_id"]: record["expires"]
+            for record in await self.fetch("select user_id, expires from blacklists where expires > $1 or expires = 1", now)
+        }
+
     async def is_blacklisted(self, user, unix):
-        if blacklist := await self.fetchrow(f"select expires from blacklists where user_id=$1", user.id):
-            return blacklist["expires"] > unix or blacklist["expires"] == 1
-        return False
+        if (expires := self.blacklist.get(user.id)) is None:
+            return False
+        return expires > unix or expires == 1
+
+    async def add_blacklist(self, user, moderator, expires, reason):
+        await self.execute("""
+        INSERT INTO blacklists (user_id, moderator_id, expires, reason)
+        VALUES ($1, $2, $3, $4) ON CONFLICT (user_id) DO UPDATE SET
+        user_id=$1, moderator_id=$2, expires=$3, reason=$4;
+        """, user.id, moderator.id, expires, reason)
+        self.blacklist[user.id] = expires
+
+    async def remove_blacklist(self, *users):
+        await self.execute("DELETE FROM blacklists WHERE user_id = ANY($1::bigint[])", [user.id for user in users])
+        for user in users:
+            self.blacklist.pop(user.id, None)
+
+    def expire_blacklist(self, user_id, unix):
+        """ Forgets a blacklist once it's over; a newer one that replaced it is kept. """
+        if (expires := self.blacklist.get(user_id)) is not None and expires != 1 and expires <= unix:
+            del self.blacklist[user_id]
 
     async def die(self, user, reason="Unknown causes"):
         """
@@ -376,7 +805,7 @@ class DatabaseManager:
 
         # Select items, if at least one exists, choose a random one and remove them
         _chosen = None
-        _items = await self.fetchrow("SELECT * FROM items WHERE user_id=$1", user.id)
+        _items = await self.get("items", user)
         old_item = 0
         if items:
             filtered = {k: v for k, v in _items.items() if v > 0 and k != 'user_id'}
@@ -391,8 +820,35 @@ class DatabaseManager:
         return reason
 
 
+    @staticmethod
+    def _roll_golden_shrimp(data, unix):
+        """
+        Golden shrimp a factory found since it was last rolled, as new column values.
+        Returns None if not a whole minute has passed yet.
+
+        Every minute is one try at golden_chance_per_minute, so this samples
+        Binomial(minutes, chance) capped at the capacity left. Each factory has its own
+        RNG, seeded at random, whose next seed is stored along with the result.
+        """
+        rolled_at = data['golden_rolled_at'] or data['last_claim']
+        minutes = int((unix - rolled_at) // 60)
+        if minutes <= 0:
+            return None
+
+        rng = random.Random(data['golden_seed'] or random.getrandbits(63))  # 0: never seeded, e.g. from before seeds were stored
+        room = max(data['golden_capacity'] - data['golden_shrimp'], 0)
+        return {
+            "golden_shrimp": data['golden_shrimp'] + _capped_binomial(rng, minutes, data['golden_chance_per_minute'], room),
+            "golden_rolled_at": rolled_at + minutes*60,
+            "golden_seed": rng.getrandbits(63)
+        }
+
     async def get_factory_info(self, user, unix):
         data = await self.get("factories", user)
+        if data['is_active'] and (golden := self._roll_golden_shrimp(data, unix)):
+            await self.set_many("factories", user, golden)
+            data = {**data, **golden}
+
         if not data['is_active']:
             return {
                 "shrimp": 0,
@@ -421,3 +877,121 @@ class DatabaseManager:
             "capacity_left": capacity_left,
             **data
         }
+
+
+def _capped_binomial(rng, trials, chance, cap):
+    """ min(Binomial(trials, chance), cap), stepping from success to success so it costs O(result). """
+    if chance <= 0 or cap <= 0:
+        return 0
+    if chance >= 1:
+        return min(trials, cap)
+
+    successes = 0
+    position = 0
+    _log_miss = math.log1p(-chance)
+    while successes < cap:
+        position += int(math.log(1.0 - rng.random()) / _log_miss) + 1  # Trials up to the next success
+        if position > trials:
+            break
+        successes += 1
+    return successes
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Transaction:
+    """ A unit of work: updates are staged, then committed all at once.
+
+        Every staged row becomes one UPDATE in a single statement, each running only if
+        the one before it went through. Rows with a minimum go first, so a failed check usually
+        stops it early. The statement runs in a transaction, and is rolled back unless every row was updated.
+        The cache only sees the changes once they are committed.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.committed = False
+        self._rows = {}  # (table, pointer, id) -> {"user": ..., "ops": {column: (op, value)}, "minimums": {column: minimum}}
+
+    def __repr__(self):
+        return f'<Transaction rows={len(self._rows)} committed={self.committed}>'
+
+    def _row(self, table, user):
+        _pointer = "user" if user.__class__.__name__ in ('User', 'Member', 'Object') else "guild"
+        return self._rows.setdefault((table, _pointer, user.id), {"user": user, "ops": {}, "minimums": {}})
+
+    def add(self, table, column, user, amount, *, minimum=None):
+        """ Stages adding to a column. If a minimum is given, the whole
+            transaction fails unless the column ends up at least that much.
+        """
+        _row = self._row(table, user)
+        self.db._merge_write(_row["ops"], column, "+", amount)
+        if minimum is not None:
+            _row["minimums"][column] = minimum
+        return self
+
+    def set(self, table, column, user, value):
+        _row = self._row(table, user)
+        _row["ops"][column] = ("=", value)
+        _row["minimums"].pop(column, None)
+        return self
+
+    async def commit(self):
+        """ Writes everything staged.
+
+            :return: Whether it went through. If not, nothing was written.
+        """
+        if not self._rows:
+            self.committed = True
+            return True
+
+        for (table, _, _), row in self._rows.items():
+            await self.db.get(table, row["user"])  # Makes sure the row exists
+        if self.db.write_behind and any(self.db._has_pending(table, _id) for table, _, _id in self._rows):
+            await self.db.flush()  # Conditions have to see what the cache sees
+
+        rows = sorted(self._rows.items(), key=lambda row: not row[1]["minimums"])
+        args, steps = [], []
+        for i, ((table, pointer, _id), row) in enumerate(rows):
+            _assignments, _params = [], {}
+            for column, (op, value) in row["ops"].items():
+                args.append(value)
+                _params[column] = len(args)
+                _assignments.append(
+                    '"{0}"="{0}"+${1}'.format(column, len(args)) if op == "+" else '"{0}"=${1}'.format(column, len(args))
+                )
+
+            args.append(_id)
+            _conditions = ['"{0}_id"=${1}'.format(pointer, len(args))]
+            for column, minimum in row["minimums"].items():
+                args.append(minimum)
+                _conditions.append('"{0}"+${1}>=${2}'.format(column, _params[column], len(args)))
+            if i:
+                _conditions.append('EXISTS (SELECT 1 FROM "step{0}")'.format(i-1))
+
+            steps.append('"step{0}" AS (UPDATE "{1}" SET {2} WHERE {3} RETURNING 1)'.format(
+                i, table, ", ".join(_assignments), " AND ".join(_conditions)
+            ))
+
+        query = "WITH {0} SELECT {1}".format(
+            ", ".join(steps), " + ".join('(SELECT count(*) FROM "step{0}")'.format(i) for i in range(len(rows)))
+        )
+
+        try:
+            async with self.db.pool.acquire() as conn:
+                async with conn.transaction():
+                    if (applied := await self.db.fetchval(query, *args, connection=conn)) < len(rows):
+                        raise _Rollback()
+        except _Rollback:
+            applied = 0
+
+        if applied < len(rows):
+            return False
+
+        for (table, _, _id), row in rows:
+            for column, (op, value) in row["ops"].items():
+                self.db._apply_committed(table, _id, column, op, value)
+        self.committed = True
+        return True
@@ -1,17 +1,46 @@
+import re
 import prettify_exceptions
 from discord.ext import commands, flags
+from discord.ext.commands.view import StringView
+from functools import partial
 from util.util import escape_markdown
+from util.errors import ErrorReporter
 from util.nets import NetNotFound
 from util.items import ItemNotFound
 from mystbin import APIError
 
 getattr(prettify_exceptions.Formatter, "_default_theme")["_ansi_enabled"] = False
 
+_WORD = re.compile(r"\S*")  # What StringView.get_word reads
+
+
+class ParsedMessage:
+    """ The parts of a message that invokes a command. """
+    __slots__ = ('prefix', 'invoked_with', 'remainder', 'bypass_cooldown', 'no_reply')
+
+    def __init__(self, prefix, invoked_with, remainder, bypass_cooldown=False, no_reply=False):
+        self.prefix = prefix
+        self.invoked_with = invoked_with
+        self.remainder = remainder
+        self.bypass_cooldown = bypass_cooldown
+        self.no_reply = no_reply
+
+    def __repr__(self):
+        return f'<ParsedMessage prefix={self.prefix!r} invoked_with={self.invoked_with!r}>'
+
+    @property
+    def content(self):
+        """ The message content with shortcuts expanded and flags removed. """
+        return self.prefix + self.invoked_with + self.remainder
+
 
 class Handler:
     def __init__(self):
         self.commands_handled = 0
         self.errors_handled = 0
+        self.errors = ErrorReporter(
+            formatter=lambda *exc: "".join(prettify_exceptions.DefaultFormatter().format_exception(*exc))
+        )
 
     def __repr__(self):
         return f'Handler(commands={self.commands_handled}, errors={self.errors_handled})'
@@ -40,53 +69,77 @@ class Handler:
         if isinstance(error, commands.MaxConcurrencyReached):
             return await ctx.send("Another instance of this command is running.")
 
-        _base = (type(error), error, error.__traceback__)
-
-        _complete_traceback = "".join(prettify_exceptions.DefaultFormatter().format_exception(*_base))
-        try:
-            _myst = await ctx.bot.mystbin.post(_complete_traceback, syntax="python")
-        except APIError:
-            _myst = ""
+        report = self.errors.report(error, partial(self._upload_traceback, ctx.bot))
 
         _error = '{0.__class__.__name__}: {0}'.format(error.original) if isinstance(error, commands.CommandInvokeError) else error
         _broad_traceback = escape_markdown(str(_error)[:1800])
 
-        await ctx.send(f"Something has gone wrong while executing your command.\n{_broad_traceback}\n\n**<{_myst}>**")
-        raise error
+        await ctx.send(f"Something has gone wrong while executing your command.\n{_broad_traceback}\n\nReference ID: `{report.id}`")
+        if report.count == 1:
+            raise error  # Repeats are only counted
 
+    @staticmethod
+    async def _upload_traceback(bot, text):
+        try:
+            return str(await bot.mystbin.post(text, syntax="python"))
+        except APIError:
+            return None
+
+
+    async def parse_message(self, bot, message):
+        """ Splits a message into prefix, invoked name, flags and remainder in one pass.
+
+            Returns None as early as possible when the message can't be a command.
+        """
+        content = message.content
+        prefix = await bot.prefixes.match(message)
+        if prefix is None:
+            prefix = next((pf for pf in commands.when_mentioned(bot, message) if content.startswith(pf)), None)
+            if prefix is None:
+                return None
+
+        body = content[len(prefix):]
+        if found_shortcut := await bot.db.get_shortcut(message.author, body.lstrip()):
+            body = found_shortcut
+
+        bypass = False
+        if "--no-cooldown" in body and await bot.is_owner(message.author):
+            body = body.replace("--no-cooldown", "", 1).strip()
+            bypass = True
+
+        no_reply = False
+        for flag in (" --no-reply", " --nr"):
+            if body.endswith(flag):
+                body = body[:-len(flag)]
+                no_reply = True
+                break
+
+        invoked_with = _WORD.match(body).group()
+        if bot.all_commands.get(invoked_with) is None:
+            return None
+        return ParsedMessage(prefix, invoked_with, body[len(invoked_with):], bypass, no_reply)
+
+    def make_context(self, bot, message, parsed, context_class):
+        """ Builds a context from a parsed message, without parsing it a second time. """
+        message.content = parsed.content
+        view = StringView(message.content)
+        view.skip_string(parsed.prefix)
+        view.get_word()
+
+        ctx = context_class(prefix=parsed.prefix, view=view, bot=bot, message=message, parsed=parsed)
+        ctx.invoked_with = parsed.invoked_with
+        ctx.command = bot.all_commands.get(parsed.invoked_with)
+        return ctx
 
     async def handle_command(self, bot, message, context_class):
-        _bypass = False
-        _no_reply = False
         if message.author.bot: return
         if not message.guild: return
 
-        _all_pf = _pf = await bot.get_prefix(message)
-        if isinstance(_all_pf, list):
-            _pf = _all_pf[0]
-
-        _content = message.content
-        for _possible_prefix in _all_pf:
-            _content = _content.replace(_possible_prefix, "", 1)
-        if found_shortcut := await bot.db.get_shortcut(message.author, _content.lstrip()):
-            if message.content.startswith(_pf) or (
-                message.content.startswith('<@{}> '.format(bot.user.id)) or
-                message.content.startswith('<@!{}> '.format(bot.user.id))
-            ):
-                message.content = _pf + found_shortcut
-
-        if "--no-cooldown" in message.content and await bot.is_owner(message.author):
-            message.content = message.content.replace("--no-cooldown", "", 1).strip()
-            _bypass = True
-
-        if message.content.endswith(" --no-reply"):
-            message.content = message.content[:-11]
-            _no_reply = True
-        elif message.content.endswith(" --nr"):
-            message.content = message.content[:-5]
-            _no_reply = True
-
-        ctx = await bot.get_context(message, cls=context_class)
+        parsed = await self.parse_message(bot, message)
+        if parsed is None:
+            return
+
+        ctx = self.make_context(bot, message, parsed, context_class)
 
         if not ctx:
             return
@@ -95,16 +148,18 @@ class Handler:
         if await ctx.db.is_blacklisted(ctx.author, ctx.unix):
             return
 
-        await self.instantiate_command(ctx, bypass=_bypass, no_reply=_no_reply)
+        await self.instantiate_command(ctx, bypass=parsed.bypass_cooldown, no_reply=parsed.no_reply)
 
     async def instantiate_command(self, ctx, **kwargs):
         if getattr(ctx.command, "disabled", False) and not await ctx.bot.is_owner(ctx.author):
             return await ctx.send("This command is currently disabled or under maintenance. Please check back later!")
+
         if not kwargs.get("bypass") and not await ctx.check_cd():
             return
+        await ctx.db.warm(ctx.author)  # One round-trip for whichever existing rows of the author aren't cached
         if kwargs.get("no_reply"):
             ctx.suppress_reply = True
 
-        ctx.bot.add_to_usage(ctx.command.qualified_name)
+        ctx.db.usage.record(ctx.command.qualified_name, ctx.guild.id)
         self.commands_handled += 1
         await ctx.bot.invoke(ctx)
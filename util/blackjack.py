@@ -157,9 +157,10 @@ class Blackjack:
     async def _listen(self):
         while True:
             try:
-                reaction, user = await self.client.wait_for_multiple("reaction_add", "reaction_remove", timeout=30, check=lambda r, u: (
-                    r.message.id == self.message.id and u.id == self.player.id and str(r.emoji) in (STAND, HIT, END)
-                ))
+                reaction, user = await self.client.router.wait_for_reaction(
+                    self.message.id, self.player.id, events=("reaction_add", "reaction_remove"), timeout=30,
+                    check=lambda r, u: str(r.emoji) in (STAND, HIT, END)
+                )
             except asyncio.TimeoutError:
                 self._timed_out = True
                 await self._process_move(2, "to")
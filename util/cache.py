@@ -0,0 +1,145 @@
+import sys
+import time
+from collections import OrderedDict
+
+
+class TableCache(OrderedDict):
+    """ An LRU mapping of id -> row, used for each table in DatabaseManager.cache.
+
+        Rows are evicted least recently used first once the table holds more than
+        `max_entries` rows or roughly `max_bytes` bytes, and expire after going
+        `ttl` seconds without being accessed. Rows that `can_evict` refuses are kept.
+    """
+
+    def __init__(self, name=None, *, max_entries=None, max_bytes=None, ttl=None, can_evict=None):
+        super().__init__()
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.can_evict = can_evict or (lambda key: True)
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._sizes = {}
+        self._accessed = {}
+
+    def __repr__(self):
+        return f'<TableCache name={self.name!r} entries={len(self)} bytes={self.bytes} ' \
+               f'hits={self.hits} misses={self.misses} evictions={self.evictions}>'
+
+    @staticmethod
+    def sizeof(row):
+        """ Rough size of a row in bytes. Column names are shared, so only values count. """
+        if isinstance(row, dict):
+            return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+        return sys.getsizeof(row)
+
+    def _expired(self, key, now):
+        return self.ttl is not None and now - self._accessed[key] > self.ttl
+
+    def _over_budget(self, entries, _bytes):
+        return (
+            (self.max_entries is not None and entries > self.max_entries) or
+            (self.max_bytes is not None and _bytes > self.max_bytes)
+        )
+
+    def peek(self, key, default=None):
+        """ Like get, but doesn't count towards the stats or refresh the row. """
+        return super().get(key, default)
+
+    def get(self, key, default=None):
+        if not super().__contains__(key):
+            self.misses += 1
+            return default
+
+        now = time.monotonic()
+        if self._expired(key, now) and self.can_evict(key):
+            del self[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._accessed[key] = now
+        self.move_to_end(key)
+        return super().__getitem__(key)
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self._accessed[key] = time.monotonic()
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if super().__contains__(key):
+            self.bytes -= self._sizes[key]
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+
+        self._sizes[key] = size = self.sizeof(value)
+        self.bytes += size
+        self._accessed[key] = time.monotonic()
+        self.evict(keep=key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.bytes -= self._sizes.pop(key)
+        self._accessed.pop(key, None)
+
+    def pop(self, key, *default):
+        if super().__contains__(key):
+            value = super().__getitem__(key)
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def clear(self):
+        super().clear()
+        self._sizes.clear()
+        self._accessed.clear()
+        self.bytes = 0
+
+    def evict(self, keep=None):
+        """ Drops expired rows, then least recently used rows until the table fits its budget.
+
+            :param keep: A key that must not be evicted, usually the one just stored
+            :return: The amount of rows dropped
+        """
+        now = time.monotonic()
+        entries, _bytes = len(self), self.bytes
+        stale = []
+
+        for key in self:  # Least recently used first
+            if key == keep:
+                break
+            expired = self._expired(key, now)
+            if not expired and not self._over_budget(entries, _bytes):
+                break
+            if self.can_evict(key):
+                stale.append((key, expired))
+                entries -= 1
+                _bytes -= self._sizes[key]
+
+        for key, expired in stale:
+            del self[key]
+            if expired:
+                self.expirations += 1
+            else:
+                self.evictions += 1
+        return len(stale)
+
+    def stats(self):
+        return {
+            "entries": len(self),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
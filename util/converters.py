@@ -8,7 +8,6 @@ from dateutil.relativedelta import relativedelta
 from util import util
 import aiohttp
 import typing
-import discord
 import core
 import re
 
@@ -149,15 +148,8 @@ class BetterMemberConverter(Converter):
         try:
             return await MemberConverter().convert(ctx, argument)
         except MemberNotFound:
-            # Let's try a utils.find:
-            def check(member):
-                return (
-                    member.name.lower() == argument.lower() or
-                    member.display_name.lower() == argument.lower() or
-                    str(member).lower() == argument.lower() or
-                    str(member.id) == argument
-                )
-            if found := discord.utils.find(check, ctx.guild.members):
+            # Let's try the name index:
+            if found := ctx.bot.names.find_member(ctx.guild, argument):
                 return found
             raise MemberNotFound(argument)
 
@@ -177,13 +169,7 @@ class BetterUserConverter(Converter):
         try:
             return await UserConverter().convert(ctx, argument)
         except UserNotFound:
-            def check(user):
-                return (
-                    user.name.lower() == argument.lower() or
-                    str(user).lower() == argument.lower() or
-                    str(user.id) == argument
-                )
-            if found := discord.utils.find(check, ctx.bot.users):
+            if found := ctx.bot.names.find_user(argument):
                 return found
             raise UserNotFound(argument)
 
@@ -0,0 +1,134 @@
+import heapq
+from util.loops import run_every
+
+
+class CooldownManager:
+    """ Keeps active command cooldowns in memory.
+
+        Changes are persisted to the command_cooldowns table in batches,
+        and cooldowns that haven't expired are loaded back on startup.
+    """
+
+    def __init__(self, db, *, flush_interval=5):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.active = {}  # user_id -> {command: expires}
+        self._heap = []  # (expires, user_id, command)
+        self._dirty = {}  # (user_id, command) -> expires
+        self._task = None
+
+    def __repr__(self):
+        return f'<CooldownManager active={len(self._heap)} pending={len(self._dirty)}>'
+
+    @staticmethod
+    def key(name):
+        return name.replace(" ", "_").replace("-", "_")
+
+    @property
+    def unix(self):
+        return self.db.bot.unix
+
+    async def load(self):
+        """ Loads every cooldown that hasn't expired yet and starts persisting. """
+        now = self.unix
+
+        await self._migrate_legacy(now)
+        await self.db.execute("DELETE FROM command_cooldowns WHERE expires <= $1", now)
+
+        for record in await self.db.fetch("SELECT * FROM command_cooldowns"):
+            self._store(record['user_id'], record['command'], record['expires'])
+
+        if self._task is None:
+            self._task = self.db.bot.loop.create_task(
+                run_every(self.flush_interval, self.flush, name="Cooldown flush")
+            )
+
+    async def _migrate_legacy(self, now):
+        """ Carries over cooldowns from the old one-column-per-command table, then drops it,
+            so that cooldowns reset since then don't come back on the next start.
+        """
+        if not await self.db.fetchval("SELECT to_regclass('cooldowns') IS NOT NULL"):
+            return
+
+        async with self.db.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("""
+                INSERT INTO command_cooldowns (user_id, command, expires)
+                SELECT user_id, key, value::bigint / 1000.0 + 1500000000
+                FROM cooldowns, jsonb_each_text(to_jsonb(cooldowns) - 'user_id')
+                WHERE value::bigint / 1000.0 + 1500000000 > $1
+                ON CONFLICT DO NOTHING
+                """, now)
+                await conn.execute("DROP TABLE cooldowns")
+
+    def _store(self, user_id, command, expires):
+        self.active.setdefault(user_id, {})[command] = expires
+        heapq.heappush(self._heap, (expires, user_id, command))
+
+    def prune(self, now=None):
+        """ Forgets expired cooldowns. """
+        now = now or self.unix
+        while self._heap and self._heap[0][0] <= now:
+            expires, user_id, command = heapq.heappop(self._heap)
+            cooldowns = self.active.get(user_id)
+            if cooldowns and cooldowns.get(command) == expires:
+                del cooldowns[command]
+                if not cooldowns:
+                    del self.active[user_id]
+
+    def get(self, user_id, name):
+        """ When the cooldown of a command ends, or 0 if it isn't on cooldown. """
+        expires = self.active.get(user_id, {}).get(self.key(name), 0)
+        return expires if expires > self.unix else 0
+
+    def get_all(self, user_id):
+        """ Every active cooldown of a user, as a dict of command -> when it ends. """
+        now = self.unix
+        return {command: expires for command, expires in self.active.get(user_id, {}).items() if expires > now}
+
+    def set(self, user_id, name, expires):
+        command = self.key(name)
+        self.prune()
+        self._dirty[user_id, command] = expires
+        if expires > self.unix:
+            self._store(user_id, command, expires)
+        elif cooldowns := self.active.get(user_id):
+            cooldowns.pop(command, None)  # Resetting; the stale heap entry is skipped by prune
+
+    async def flush(self):
+        """ Persists changed cooldowns. Ones that were reset or expired in the meantime are deleted. """
+        if not self._dirty:
+            return
+
+        dirty, self._dirty = self._dirty, {}
+        now = self.unix
+        _upsert, _reset = [], []
+        for (user_id, command), expires in dirty.items():
+            if expires > now:
+                _upsert.append((user_id, command, expires))
+            else:
+                _reset.append((user_id, command))  # An older stored row must not come back on restart
+
+        try:
+            if _upsert:
+                await self.db.execute("""
+                INSERT INTO command_cooldowns (user_id, command, expires)
+                SELECT * FROM unnest($1::bigint[], $2::text[], $3::double precision[])
+                ON CONFLICT (user_id, command) DO UPDATE SET expires=EXCLUDED.expires
+                """, *map(list, zip(*_upsert)))
+            if _reset:
+                await self.db.execute("""
+                DELETE FROM command_cooldowns WHERE (user_id, command) IN (
+                    SELECT * FROM unnest($1::bigint[], $2::text[])
+                )
+                """, *map(list, zip(*_reset)))
+        except Exception:
+            for key, expires in dirty.items():
+                self._dirty.setdefault(key, expires)
+            raise
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
@@ -0,0 +1,52 @@
+import asyncio
+
+
+class EditCoalescer:
+    """ Spaces out edits of the same message, keeping only the latest one that's waiting.
+
+        While an edit of a message is in flight, or one was made less than `interval` seconds ago,
+        further edits replace each other and only the last one is sent. Everyone who asked for
+        an edit in the meantime gets the same future, which resolves once that edit is done.
+    """
+
+    def __init__(self, client, *, interval=1.):
+        self.client = client
+        self.interval = interval
+        self.coalesced = 0
+        self._pending = {}  # message_id -> [message, kwargs, future]
+        self._workers = {}  # message_id -> task
+
+    def __repr__(self):
+        return f'<EditCoalescer pending={len(self._pending)} coalesced={self.coalesced}>'
+
+    def edit(self, message, **kwargs):
+        """ Queues an edit and returns a future for the edit that ends up being sent. """
+        message_id = message.id
+        if (entry := self._pending.get(message_id)) is not None:
+            entry[0], entry[1] = message, kwargs
+            self.coalesced += 1
+            return entry[2]
+
+        future = self.client.loop.create_future()
+        self._pending[message_id] = [message, kwargs, future]
+        if message_id not in self._workers:
+            self._workers[message_id] = self.client.loop.create_task(self._drain(message_id))
+        return future
+
+    async def _drain(self, message_id):
+        try:
+            while (entry := self._pending.pop(message_id, None)) is not None:
+                message, kwargs, future = entry
+                try:
+                    await message.edit(**kwargs)
+                except Exception as exc:
+                    if not future.done():
+                        future.set_exception(exc)
+                else:
+                    if not future.done():
+                        future.set_result(message)
+                await asyncio.sleep(self.interval)
+        finally:
+            del self._workers[message_id]
+            if (entry := self._pending.pop(message_id, None)) is not None and not entry[2].done():
+                entry[2].cancel()  # Only if we were cancelled ourselves
@@ -0,0 +1,102 @@
+import time
+import asyncio
+import hashlib
+import traceback
+from collections import OrderedDict
+
+
+class ErrorReport:
+    __slots__ = ('id', 'type', 'message', 'count', 'first_seen', 'last_seen', 'traceback', 'url')
+
+    def __init__(self, _id, error, formatted):
+        self.id = _id
+        self.type = type(error).__name__
+        self.message = str(error)
+        self.count = 0
+        self.first_seen = self.last_seen = time.time()
+        self.traceback = formatted
+        self.url = None
+
+    def __repr__(self):
+        return f'<ErrorReport id={self.id} type={self.type} count={self.count}>'
+
+
+class ErrorReporter:
+    """ Groups errors by fingerprint and uploads one traceback per group in the background.
+
+        The fingerprint is the exception type plus the (file, function) of every frame,
+        so the same bug hit with different arguments or line shifts counts as one error.
+        A group is uploaded again once `window` seconds passed since it was first seen.
+    """
+
+    def __init__(self, *, formatter=None, window=600, upload_interval=5, max_queued=50, max_reports=500):
+        self.formatter = formatter or (lambda *exc: "".join(traceback.format_exception(*exc)))
+        self.window = window
+        self.upload_interval = upload_interval
+        self.max_reports = max_reports
+        self.reports = OrderedDict()  # fingerprint -> ErrorReport, most recent last
+        self.dropped = 0
+        self._queue = asyncio.Queue(maxsize=max_queued)
+        self._task = None
+
+    def __repr__(self):
+        return f'<ErrorReporter reports={len(self.reports)} queued={self._queue.qsize()}>'
+
+    @staticmethod
+    def root(error):
+        """ The exception that started it all, e.g. the original error of a CommandInvokeError. """
+        while error.__cause__ is not None:
+            error = error.__cause__
+        return error
+
+    def fingerprint(self, error):
+        error = self.root(error)
+        frames = traceback.extract_tb(error.__traceback__)
+        _key = "|".join([type(error).__qualname__, *(f"{frame.filename}:{frame.name}" for frame in frames)])
+        return hashlib.sha1(_key.encode()).hexdigest()
+
+    def report(self, error, upload):
+        """ Records an error and returns its ErrorReport.
+
+            :param error: The exception. It's fingerprinted by its root cause, but formatted as a whole.
+            :param upload: A coroutine function taking the traceback text and returning its URL.
+        """
+        fingerprint = self.fingerprint(error)
+        entry = self.reports.get(fingerprint)
+        if entry is None or time.time() - entry.first_seen > self.window:
+            formatted = self.formatter(type(error), error, error.__traceback__)
+            entry = self.reports[fingerprint] = ErrorReport(fingerprint[:8], self.root(error), formatted)
+            self._enqueue(entry, upload)
+            if len(self.reports) > self.max_reports:
+                self.reports.popitem(last=False)
+
+        entry.count += 1
+        entry.last_seen = time.time()
+        self.reports.move_to_end(fingerprint)
+        return entry
+
+    def _enqueue(self, entry, upload):
+        try:
+            self._queue.put_nowait((entry, upload))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._upload_loop())
+
+    async def _upload_loop(self):
+        while True:
+            entry, upload = await self._queue.get()
+            try:
+                entry.url = await upload(entry.traceback)
+            except Exception:  # The traceback is still kept in memory
+                pass
+            await asyncio.sleep(self.upload_interval)
+
+    def get(self, reference):
+        """ Finds an error by its reference ID. """
+        for entry in reversed(self.reports.values()):
+            if entry.id == reference:
+                return entry
+        return None
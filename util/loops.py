@@ -0,0 +1,22 @@
+import asyncio
+import logging
+
+log = logging.getLogger(__name__)
+
+
+async def run_every(interval, callback, *, name, condition=None):
+    """ Awaits `callback()` every `interval` seconds, for as long as `condition()` holds if given.
+        Failures are logged and the next run goes ahead as usual. Meant to be run as a task.
+    """
+    while condition is None or condition():
+        await asyncio.sleep(interval)
+        try:
+            await callback()
+        except Exception:
+            log.exception("%s failed, retrying in %s seconds", name, interval)
+
+
+def log_failure(task, name):
+    """ Done callback that retrieves a background task's exception and logs it. """
+    if not task.cancelled() and (error := task.exception()) is not None:
+        log.error("%s failed", name, exc_info=error)
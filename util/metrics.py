@@ -0,0 +1,119 @@
+import re
+import math
+import time
+from collections import deque
+
+
+class LatencyHistogram:
+    """ A log-scale histogram of durations, in seconds.
+
+        Bucket i holds durations up to BASE * GROWTH ** i; the last one is open-ended.
+        Percentiles are estimated from bucket bounds, so they are accurate to about 20%.
+    """
+
+    BASE = 0.0001
+    GROWTH = 1.2
+    SIZE = 64
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * self.SIZE
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds <= self.BASE:
+            index = 0
+        else:
+            index = min(math.ceil(math.log(seconds / self.BASE, self.GROWTH)), self.SIZE - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent):
+        if not self.count:
+            return 0.0
+
+        target = self.count * percent / 100
+        running = 0
+        for index, amount in enumerate(self.counts):
+            running += amount
+            if running >= target:
+                return min(self.BASE * self.GROWTH ** index, self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class QueryStats:
+    """ Keeps a ring buffer of recent database calls and latency stats per normalized query. """
+
+    _literals = re.compile(r"'(?:[^']|'')*'|(?<![$\w\"])\d+(?:\.\d+)?\b")
+    _whitespace = re.compile(r"\s+")
+
+    def __init__(self, *, recent=500, max_queries=1000):
+        self.recent = deque(maxlen=recent)
+        self.max_queries = max_queries
+        self.queries = {}
+
+    def __repr__(self):
+        return f'<QueryStats queries={len(self.queries)} recent={len(self.recent)}>'
+
+    @classmethod
+    def normalize(cls, query):
+        """ Collapses whitespace and replaces inline literals, so the same query shares its stats. """
+        return cls._literals.sub("?", cls._whitespace.sub(" ", query).strip())
+
+    def record(self, method, query, duration, *, rows=0, error=False):
+        self.recent.append({
+            "method": method,
+            "query": query,
+            "duration": duration,
+            "time": time.time()
+        })
+
+        key = self.normalize(query)
+        if (entry := self.queries.get(key)) is None:
+            if len(self.queries) >= self.max_queries:
+                key = "<other>"  # Don't let one-off queries grow this forever
+            entry = self.queries.setdefault(key, {
+                "query": key,
+                "latency": LatencyHistogram(),
+                "rows": 0,
+                "errors": 0
+            })
+
+        entry["latency"].add(duration)
+        entry["rows"] += rows
+        entry["errors"] += error
+
+    def summary(self, *, limit=None, sort="total"):
+        """ Stats of each normalized query, ordered by the given key (descending).
+
+            :return: A list of dicts with query, count, total, mean, p50, p95, p99, max, rows and errors.
+                     Durations are in seconds.
+        """
+        entries = [{
+            "query": entry["query"],
+            "count": (latency := entry["latency"]).count,
+            "total": latency.total,
+            "mean": latency.mean,
+            "p50": latency.percentile(50),
+            "p95": latency.percentile(95),
+            "p99": latency.percentile(99),
+            "max": latency.max,
+            "rows": entry["rows"],
+            "errors": entry["errors"]
+        } for entry in self.queries.values()]
+
+        entries.sort(key=lambda entry: entry[sort], reverse=True)
+        return entries[:limit] if limit is not None else entries
+
+    def reset(self):
+        self.recent.clear()
+        self.queries.clear()
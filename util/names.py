@@ -0,0 +1,144 @@
+from bisect import bisect_left, insort
+
+
+class NameIndex:
+    """ Casefolded names of members or users, mapped back to their IDs.
+
+        Exact lookups are dict hits; prefix lookups scan a bounded slice of the sorted names.
+        The names are sorted once when the index is built, then kept sorted as events come in.
+    """
+
+    def __init__(self, entries=()):
+        self._keys = {}  # id -> keys
+        self._ids = {}  # key -> {id: None}, oldest first
+        for _id, names in entries:
+            self._keys[_id] = keys = self._casefold(names)
+            for key in keys:
+                self._ids.setdefault(key, {})[_id] = None
+        self._sorted = sorted(self._ids)  # every key, sorted
+
+    def __repr__(self):
+        return f'<NameIndex entries={len(self._keys)}>'
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def _casefold(names):
+        return tuple(dict.fromkeys(name.casefold() for name in names))
+
+    def add(self, _id, names):
+        keys = self._casefold(names)
+        if self._keys.get(_id) == keys:
+            return
+        self.remove(_id)
+
+        self._keys[_id] = keys
+        for key in keys:
+            if (ids := self._ids.get(key)) is None:
+                ids = self._ids[key] = {}
+                insort(self._sorted, key)
+            ids[_id] = None
+
+    def remove(self, _id):
+        for key in self._keys.pop(_id, ()):
+            ids = self._ids[key]
+            del ids[_id]
+            if not ids:
+                del self._ids[key]
+                del self._sorted[bisect_left(self._sorted, key)]
+
+    def find(self, argument):
+        """ IDs whose names equal the argument, ignoring case. """
+        return list(self._ids.get(argument.casefold(), ()))
+
+    def find_prefix(self, argument, *, limit=25):
+        """ IDs with a name starting with the argument, looking at no more than `limit` names. """
+        prefix = argument.casefold()
+        found = {}
+        start = bisect_left(self._sorted, prefix)
+        for key in self._sorted[start:start+limit]:
+            if not key.startswith(prefix):
+                break
+            found.update(self._ids[key])
+        return list(found)
+
+
+class NameDirectory:
+    """ Name indexes for every guild's members (built on first use) and one for all users.
+
+        Kept up to date from member and user events; IDs that no longer resolve are dropped on lookup.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.guilds = {}  # guild_id -> NameIndex
+        self._users = None
+
+    def __repr__(self):
+        return f'<NameDirectory guilds={len(self.guilds)}>'
+
+    @staticmethod
+    def member_names(member):
+        return member.name, member.display_name, str(member)
+
+    @staticmethod
+    def user_names(user):
+        return user.name, str(user)
+
+    def guild(self, guild):
+        if (index := self.guilds.get(guild.id)) is None:
+            index = self.guilds[guild.id] = NameIndex(
+                (member.id, self.member_names(member)) for member in guild.members
+            )
+        return index
+
+    def users(self):
+        if self._users is None:
+            self._users = NameIndex((user.id, self.user_names(user)) for user in self.client.users)
+        return self._users
+
+    def _resolve(self, index, argument, get):
+        """ Exact matches first, then a name that starts with the argument if only one does. """
+        for lookup, unique in ((index.find, False), (index.find_prefix, True)):
+            found = []
+            for _id in lookup(argument):
+                if (entity := get(_id)) is not None:
+                    found.append(entity)
+                else:
+                    index.remove(_id)
+            if found and (not unique or len(found) == 1):
+                return found[0]
+        return None
+
+    def find_member(self, guild, argument):
+        return self._resolve(self.guild(guild), argument, guild.get_member)
+
+    def find_user(self, argument):
+        return self._resolve(self.users(), argument, self.client.get_user)
+
+    # Events, registered as listeners on the bot
+
+    async def on_member_join(self, member):
+        if (index := self.guilds.get(member.guild.id)) is not None:
+            index.add(member.id, self.member_names(member))
+        if self._users is not None:
+            self._users.add(member.id, self.user_names(member))
+
+    async def on_member_update(self, before, after):
+        if (index := self.guilds.get(after.guild.id)) is not None:
+            index.add(after.id, self.member_names(after))
+
+    async def on_member_remove(self, member):
+        if (index := self.guilds.get(member.guild.id)) is not None:
+            index.remove(member.id)
+
+    async def on_user_update(self, before, after):
+        if self._users is not None:
+            self._users.add(after.id, self.user_names(after))
+        for guild_id, index in self.guilds.items():
+            if (guild := self.client.get_guild(guild_id)) and (member := guild.get_member(after.id)):
+                index.add(after.id, self.member_names(member))
+
+    async def on_guild_remove(self, guild):
+        self.guilds.pop(guild.id, None)
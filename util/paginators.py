@@ -1,3 +1,5 @@
+import math
+import asyncio
 import discord
 from discord.ext import menus
 from jishaku.paginators import WrappedPaginator, PaginatorInterface
@@ -80,6 +82,42 @@ class MenuPages(menus.Menu):
         await self._source._prepare_once()
         await super().start(ctx, channel=channel, wait=wait)
 
+    async def _internal_loop(self):
+        # Menu._internal_loop, except reactions are waited for through the bot's InteractionRouter,
+        # so open menus don't each add a wait_for check that every reaction event has to run.
+        timed_out = False
+        try:
+            while self._running:
+                payload = await self.bot.router.wait_for_raw_reaction(
+                    self.message.id, events=("raw_reaction_add", "raw_reaction_remove"),
+                    check=self.reaction_check, timeout=self.timeout
+                )
+                self.bot.loop.create_task(self.update(payload))
+        except asyncio.TimeoutError:
+            timed_out = True
+        finally:
+            self._event.set()
+            try:
+                await self.finalize(timed_out)
+            except Exception:
+                pass
+
+            if self.bot.is_closed():
+                return
+            try:
+                if self.delete_message_after:
+                    return await self.message.delete()
+                if self.clear_reactions_after:
+                    if self._can_remove_reactions:
+                        return await self.message.clear_reactions()
+                    for button_emoji in self.buttons:
+                        try:
+                            await self.message.remove_reaction(button_emoji, self.bot.user)
+                        except discord.HTTPException:
+                            continue
+            except Exception:
+                pass
+
     async def show_checked_page(self, page_number):
         max_pages = self._source.get_max_pages()
         try:
@@ -130,7 +168,7 @@ class MenuPages(menus.Menu):
     async def user_input(self, _):
         """ui"""
         original = await self.ctx.send("Which page would you like to go to?")
-        response = await self.ctx.bot.wait_for("message", timeout=30, check=lambda m: m.author==self.ctx.author and m.channel==self.ctx.channel)
+        response = await self.ctx.bot.router.wait_for_message(self.ctx.channel.id, self.ctx.author.id, timeout=30)
         if not response.content.isdigit():
             return await self.ctx.maybe_edit(original, "Not a valid page.")
         response_formatted = min(self._source.get_max_pages(), int(response.content))
@@ -198,6 +236,47 @@ class NewlineEmbedPageSource(menus.ListPageSource):
         return embed
 
 
+class LazyNewlineEmbedPageSource(menus.PageSource):
+    """ Like NewlineEmbedPageSource, but each page's lines are only fetched once it is shown.
+
+        `fetch` is a coroutine function taking (offset, limit) and returning
+        the lines of that slice along with the total amount of lines.
+    """
+
+    def __init__(self, embed, fetch, per_page, footer=None, prefix="", suffix=""):
+        self.embed = embed
+        self.fetch = fetch
+        self.per_page = per_page
+        self.max_page = 1
+        self.p, self.s = prefix, suffix
+        self.footer = footer
+        self._pages = {}
+
+    async def prepare(self):
+        await self.get_page(0)  # Also finds out how many pages there are
+
+    def is_paginating(self):
+        return self.max_page > 1
+
+    def get_max_pages(self):
+        return self.max_page
+
+    async def get_page(self, page_number):
+        if page_number not in self._pages:
+            lines, total = await self.fetch(page_number*self.per_page, self.per_page)
+            self.max_page = max(math.ceil(total/self.per_page), 1)
+            self._pages[page_number] = lines
+        return self._pages[page_number]
+
+    async def format_page(self, menu, item):
+        self.embed.description = self.p+("\n".join(item))+self.s
+
+        if self.footer is not None:
+            page_text = f"{menu.current_page + 1}/{self.max_page}"
+            self.embed.set_footer(text=self.footer.format(page=page_text))
+        return self.embed
+
+
 async def field_paginate(ctx, base_embed, field_kwargs, *, per_page=5, footer=None):
 
     field_kwargs = [(base_embed, f) for f in field_kwargs]
@@ -219,6 +298,12 @@ async def newline_paginate(ctx, base_embed, lines, *, per_page=10, footer=None,
     await menu.start(ctx)
 
 
+async def lazy_newline_paginate(ctx, base_embed, fetch, *, per_page=10, footer=None, prefix="", suffix=""):
+
+    menu = MenuPages(LazyNewlineEmbedPageSource(base_embed, fetch, per_page=per_page, footer=footer, prefix=prefix, suffix=suffix))
+    await menu.start(ctx)
+
+
 async def auto_paginate(ctx, text, prefix='```', suffix='```', max_size=2000, wrap_at=(' ', '\n')):
     paginator = WrappedPaginator(prefix=prefix, suffix=suffix, max_size=max_size, wrap_on=wrap_at)
     paginator.add_line(text)
@@ -0,0 +1,39 @@
+import re
+
+
+class PrefixMatcher:
+    """ Compiled prefix patterns of each guild, so messages aren't matched against a freshly built regex.
+
+        Patterns are compiled the first time a guild is seen and kept until invalidate() is called,
+        which DatabaseManager does whenever it writes that guild's prefixes.
+    """
+
+    DEFAULT = ("s.",)
+
+    def __init__(self, db):
+        self.db = db
+        self.patterns = {}  # guild_id -> compiled pattern
+
+    def __repr__(self):
+        return f'<PrefixMatcher guilds={len(self.patterns)}>'
+
+    @staticmethod
+    def compile(prefixes):
+        return re.compile("|".join(map(re.escape, prefixes)), flags=re.I)
+
+    async def pattern(self, guild):
+        if guild is None:
+            return self.compile(self.DEFAULT)
+
+        if (compiled := self.patterns.get(guild.id)) is None:
+            _prefixes = await self.db.get("guilds", guild, "prefixes") or self.DEFAULT
+            compiled = self.patterns[guild.id] = self.compile(_prefixes)
+        return compiled
+
+    async def match(self, message):
+        """ The prefix the message starts with, or None. """
+        match = (await self.pattern(message.guild)).match(message.content)
+        return match.group() if match else None
+
+    def invalidate(self, guild_id):
+        self.patterns.pop(guild_id, None)
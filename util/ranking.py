@@ -0,0 +1,66 @@
+from bisect import bisect_left, insort
+from util.loops import run_every
+
+
+class RankIndex:
+    """ Net worth (shrimp + vault) of every user, kept sorted for rank lookups.
+
+        Ranks follow SQL's RANK(): 1 + the amount of users worth strictly more.
+        The index is kept up to date from DatabaseManager.add/set and is rebuilt
+        from the users table every so often in case anything slipped past.
+    """
+
+    def __init__(self, db, *, reconcile_interval=600):
+        self.db = db
+        self.reconcile_interval = reconcile_interval
+        self.worths = {}  # user_id -> worth
+        self._sorted = []  # (-worth, user_id), richest first
+        self._task = None
+
+    def __repr__(self):
+        return f'<RankIndex users={len(self.worths)}>'
+
+    def __len__(self):
+        return len(self.worths)
+
+    async def load(self):
+        await self.reconcile()
+        if self._task is None:
+            self._task = self.db.bot.loop.create_task(
+                run_every(self.reconcile_interval, self.reconcile, name="Rank reconcile")
+            )
+
+    async def reconcile(self):
+        """ Rebuilds the index from the database. Cached rows win, since they may be ahead of it. """
+        worths = {
+            record['user_id']: record['worth']
+            for record in await self.db.fetch("SELECT user_id, shrimp + vault AS worth FROM users")
+        }
+        for user_id, row in list(self.db.get_table_cache("users").items()):
+            if "shrimp" in row and "vault" in row:
+                worths[user_id] = row["shrimp"] + row["vault"]
+
+        self.worths = worths
+        self._sorted = sorted((-worth, user_id) for user_id, worth in worths.items())
+
+    def update(self, user_id, worth):
+        if (old := self.worths.get(user_id)) is not None:
+            if old == worth:
+                return
+            del self._sorted[bisect_left(self._sorted, (-old, user_id))]
+        self.worths[user_id] = worth
+        insort(self._sorted, (-worth, user_id))
+
+    def remove(self, user_id):
+        if (old := self.worths.pop(user_id, None)) is not None:
+            del self._sorted[bisect_left(self._sorted, (-old, user_id))]
+
+    def rank(self, user_id):
+        """ The rank of a user, or None if they aren't indexed. """
+        if (worth := self.worths.get(user_id)) is None:
+            return None
+        return bisect_left(self._sorted, (-worth,)) + 1
+
+    def top(self, k=10):
+        """ The k richest users as (user_id, worth) pairs. """
+        return [(user_id, -worth) for worth, user_id in self._sorted[:k]]
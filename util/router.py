@@ -0,0 +1,81 @@
+import asyncio
+
+
+class InteractionRouter:
+    """ Routes messages and reactions straight to the sessions waiting on them.
+
+        Unlike bot.wait_for, which runs every pending check on every event, waiters are keyed by
+        (channel_id, author_id) for messages, (message_id, user_id) for reactions and message_id
+        for raw reactions, so an event only reaches the checks of the sessions it can belong to.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._messages = {}  # (channel_id, author_id) -> [(future, check)]
+        self._reactions = {}  # (message_id, user_id or None) -> [(future, events, check)]
+        self._raw_reactions = {}  # message_id -> [(future, events, check)]
+
+    def __repr__(self):
+        return f'<InteractionRouter messages={len(self._messages)} reactions={len(self._reactions) + len(self._raw_reactions)}>'
+
+    async def _wait(self, listeners, key, entry, timeout):
+        listeners.setdefault(key, []).append(entry)
+        try:
+            return await asyncio.wait_for(entry[0], timeout)
+        finally:
+            if (waiting := listeners.get(key)) is not None:
+                if entry in waiting:
+                    waiting.remove(entry)
+                if not waiting:
+                    del listeners[key]
+
+    async def wait_for_message(self, channel_id, author_id, *, check=None, timeout=None):
+        """ Waits for the next message by an author in a channel that passes the check.
+
+            :raises asyncio.TimeoutError: Nothing came in time.
+        """
+        future = self.client.loop.create_future()
+        return await self._wait(self._messages, (channel_id, author_id), (future, check), timeout)
+
+    async def wait_for_reaction(self, message_id, user_id=None, *, events=("reaction_add",), check=None, timeout=None):
+        """ Waits for a reaction on a message by the given user, or anyone if user_id is None.
+
+            :return: A (reaction, user) tuple.
+            :raises asyncio.TimeoutError: Nothing came in time.
+        """
+        future = self.client.loop.create_future()
+        return await self._wait(self._reactions, (message_id, user_id), (future, frozenset(events), check), timeout)
+
+    async def wait_for_raw_reaction(self, message_id, *, events=("raw_reaction_add",), check=None, timeout=None):
+        """ Waits for a raw reaction event on a message, which also comes for uncached messages.
+
+            :return: The RawReactionActionEvent.
+            :raises asyncio.TimeoutError: Nothing came in time.
+        """
+        future = self.client.loop.create_future()
+        return await self._wait(self._raw_reactions, message_id, (future, frozenset(events), check), timeout)
+
+    @staticmethod
+    def _resolve(future, check, *args):
+        if future.done():
+            return
+        try:
+            if check is None or check(*args):
+                future.set_result(args[0] if len(args) == 1 else args)
+        except Exception as exc:
+            future.set_exception(exc)
+
+    def dispatch_message(self, message):
+        for future, check in list(self._messages.get((message.channel.id, message.author.id), ())):
+            self._resolve(future, check, message)
+
+    def dispatch_reaction(self, event, reaction, user):
+        for key in ((reaction.message.id, user.id), (reaction.message.id, None)):
+            for future, events, check in list(self._reactions.get(key, ())):
+                if event in events:
+                    self._resolve(future, check, reaction, user)
+
+    def dispatch_raw_reaction(self, event, payload):
+        for future, events, check in list(self._raw_reactions.get(payload.message_id, ())):
+            if event in events:
+                self._resolve(future, check, payload)
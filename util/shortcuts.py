@@ -0,0 +1,55 @@
+class ShortcutIndex:
+    """ The shortcuts of a single user, indexed by name and alias.
+
+        Exact names are looked up directly; "shortcut + arguments" is narrowed
+        down by the first word of the message before checking full names.
+    """
+
+    def __init__(self, records=()):
+        self.shortcuts = []  # In creation order
+        self.exact = {}  # name/alias -> shortcut
+        self.tokens = {}  # first word of a name/alias -> [names/aliases]
+        for record in records:
+            self.add(dict(record))
+
+    def __repr__(self):
+        return f'<ShortcutIndex shortcuts={len(self.shortcuts)}>'
+
+    def __len__(self):
+        return len(self.shortcuts)
+
+    def __iter__(self):
+        return iter(self.shortcuts)
+
+    @staticmethod
+    def _keys(shortcut):
+        return shortcut["name"], *shortcut["aliases"]
+
+    def add(self, shortcut):
+        self.shortcuts.append(shortcut)
+        for key in self._keys(shortcut):
+            if key not in self.exact:
+                self.exact[key] = shortcut
+                self.tokens.setdefault(key.split(" ", 1)[0], []).append(key)
+
+    def remove(self, name):
+        """ Removes a shortcut by its name and returns it, or None if there isn't one. """
+        for shortcut in self.shortcuts:
+            if shortcut["name"] == name:
+                break
+        else:
+            return None
+
+        # Rare enough that rebuilding is simpler than patching every key
+        self.__init__([sc for sc in self.shortcuts if sc is not shortcut])
+        return shortcut
+
+    def resolve(self, content):
+        """ The command the (lowercase) content maps to, or None. """
+        if (shortcut := self.exact.get(content)) is not None:
+            return shortcut["command"]
+
+        for key in self.tokens.get(content.split(" ", 1)[0], ()):
+            if content.startswith(key + " "):
+                return self.exact[key]["command"]
+        return None
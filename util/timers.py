@@ -1,13 +1,17 @@
+import math
+import heapq
 import asyncio
+import logging
 import datetime
-import discord
-import asyncpg
 from humanize import naturaltime
 from json import loads, dumps
+from util.loops import run_every
+
+log = logging.getLogger(__name__)
 
 
 class Timer:
-    __slots__ = ('args', 'kwargs', 'event', 'id', 'created_at', 'expires', 'manager', 'finished')
+    __slots__ = ('args', 'kwargs', 'event', 'id', 'owner_id', 'created_at', 'expires', 'manager', 'finished')
 
     def __init__(self, record, manager):
         self.id = record['id']
@@ -15,6 +19,7 @@ class Timer:
         self.finished = False
 
         self.event = record['event']
+        self.owner_id = record.get('owner_id')
         self.created_at = record['created']
         self.expires = record['expires']
 
@@ -27,11 +32,12 @@ class Timer:
         await self.manager.call_timer(self)
 
     @classmethod
-    def partial(cls, manager, *, expires, created, event, args, kwargs):
+    def partial(cls, manager, *, expires, created, event, args, kwargs, owner_id=None):
         pseudo = {
             'id': None,
             'extra': dumps({'args': args, 'kwargs': kwargs}),
             'event': event,
+            'owner_id': owner_id,
             'created': created,
             'expires': expires
         }
@@ -54,31 +60,187 @@ class Timer:
         return f'<Timer created={self.created_at} expires={self.expires} event={self.event}>'
 
 
+class TimingWheel:
+    """ Holds short timers in a hashed wheel of `size` slots, `tick` seconds apart, driven by one task.
+
+        Adding and cancelling are O(1). Timers still waiting are written to the timers table
+        every `checkpoint_interval` seconds, so that a restart replays them from there;
+        ones that fire before their first checkpoint never touch the database.
+    """
+
+    def __init__(self, manager, *, tick=.1, size=512, checkpoint_interval=5):
+        self.manager = manager
+        self.tick = tick
+        self.size = size
+        self.checkpoint_interval = checkpoint_interval
+        self.slots = [{} for _ in range(size)]  # key -> [rounds left, timer]
+        self.saved = set()  # Row IDs of checkpointed timers still on the wheel
+        self._where = {}  # key -> slot
+        self._cursor = 0
+        self._unsaved = {}  # key -> timer
+        self._finished = []  # Row IDs of checkpointed timers that fired or were cancelled
+        self._deleting = []  # Same, while a checkpoint deletes them
+        self._task = None
+        self._checkpoint_task = None
+
+    def __repr__(self):
+        return f'<TimingWheel timers={len(self._where)} unsaved={len(self._unsaved)}>'
+
+    def __len__(self):
+        return len(self._where)
+
+    def add(self, timer, delay):
+        ticks = max(math.ceil(delay / self.tick), 1)
+        rounds, offset = divmod(ticks - 1, self.size)
+        slot = (self._cursor + offset + 1) % self.size
+
+        key = id(timer)
+        self.slots[slot][key] = [rounds, timer]
+        self._where[key] = slot
+        self._unsaved[key] = timer
+
+        loop = self.manager.client.loop
+        if self._task is None:
+            self._task = loop.create_task(self._drive())
+        if self._checkpoint_task is None:
+            self._checkpoint_task = loop.create_task(self._checkpoint_loop())
+
+    def _forget(self, key, timer):
+        del self._where[key]
+        if self._unsaved.pop(key, None) is None and timer.id is not None:
+            self.saved.discard(timer.id)
+            self._finished.append(timer.id)
+
+    def timers(self):
+        return [timer for slot in self.slots for _, timer in slot.values()]
+
+    def done(self):
+        """ Row IDs of timers that are done but may still be in the timers table. """
+        return {*self._finished, *self._deleting}
+
+    def cancel(self, timer):
+        key = id(timer)
+        if (slot := self._where.get(key)) is None:
+            return False
+        del self.slots[slot][key]
+        self._forget(key, timer)
+        return True
+
+    async def _drive(self):
+        loop = asyncio.get_event_loop()
+        next_tick = loop.time()
+        try:
+            while self._where:
+                next_tick += self.tick
+                await asyncio.sleep(max(next_tick - loop.time(), 0))
+                self._cursor = (self._cursor + 1) % self.size
+
+                due = []
+                slot = self.slots[self._cursor]
+                for key, entry in list(slot.items()):
+                    if entry[0] > 0:
+                        entry[0] -= 1
+                        continue
+                    del slot[key]
+                    self._forget(key, entry[1])
+                    due.append(entry[1])
+
+                for timer in due:
+                    await self.manager.initialize_finished_timer(timer)
+        finally:
+            self._task = None
+
+    async def _checkpoint_loop(self):
+        try:
+            await run_every(
+                self.checkpoint_interval, self.checkpoint, name="Timer checkpoint",
+                condition=lambda: self._where or self._finished
+            )
+        finally:
+            self._checkpoint_task = None
+
+    async def checkpoint(self):
+        """ Writes timers that are still waiting to the timers table, and removes the ones that are done. """
+        db = self.manager.db
+        if self._finished:
+            finished = self._deleting = self._finished
+            self._finished = []
+            try:
+                await db.execute("DELETE FROM timers WHERE id = ANY($1::bigint[])", finished)
+            except Exception:
+                self._finished.extend(finished)
+                raise
+            finally:
+                self._deleting = []
+
+        if not self._unsaved:
+            return
+
+        unsaved, self._unsaved = self._unsaved, {}
+        try:
+            rows = await db.fetch(
+                "INSERT INTO timers (event, extra, expires, created, owner_id) "
+                "SELECT * FROM unnest($1::text[], $2::text[], $3::timestamp[], $4::timestamp[], $5::bigint[]) RETURNING id;",
+                *self.manager.columns(unsaved.values())
+            )
+        except Exception:
+            for key, timer in unsaved.items():
+                if key in self._where:
+                    self._unsaved[key] = timer
+            raise
+
+        for (key, timer), row in zip(unsaved.items(), rows):
+            timer.id = row['id']
+            if key in self._where:
+                self.saved.add(timer.id)
+            else:
+                self._finished.append(timer.id)  # Fired while we were saving it
+
+    async def close(self):
+        for task in (self._task, self._checkpoint_task):
+            if task is not None:
+                task.cancel()
+        await self.checkpoint()
+
+
 class BotTimerManager:
-    def __init__(self, client):
+    """ Dispatches timers from a min-heap of everything due within the look-ahead window.
+
+        The window is loaded in one query; timers created inside it go straight onto the heap,
+        and every timer that's due is fired in the same wake-up, with one DELETE for all of them.
+    """
+
+    def __init__(self, client, *, window=86400, retry_after=5):
         self.db = client.db.pool
         self.client = client
-        self._buffer = None
-        self._cached = asyncio.Event(loop=client.loop)
+        self.window = datetime.timedelta(seconds=window)
+        self.retry_after = retry_after
+        self._heap = []  # (expires, id, timer)
+        self._queued = set()  # IDs on the heap
+        self._horizon = None  # Every timer expiring before this is on the heap
+        self._wakeup = asyncio.Event()
+        self.wheel = TimingWheel(self)
         self.timer_task = client.loop.create_task(self.dispatch_timers())
 
-    async def get_timer(self, days=7):
-        record = await self.db.fetchrow(
-            "SELECT * FROM timers WHERE expires < (CURRENT_DATE + $1::interval) ORDER BY expires LIMIT 1;",
-            datetime.timedelta(days=days)
-        )
-        return Timer(record, self) if record else None
+    def __repr__(self):
+        return f'<BotTimerManager queued={len(self._heap)} horizon={self._horizon}>'
 
-    async def wait_for_timers(self, days=7):
-        timer = await self.get_timer(days=days)
-        if timer is not None:
-            self._cached.set()
-            return timer
+    def _push(self, timer):
+        if timer.id in self._queued or timer.id in self.wheel.saved:
+            return
+        self._queued.add(timer.id)
+        heapq.heappush(self._heap, (timer.expires, timer.id, timer))
+        if self._heap[0][2] is timer:
+            self._wakeup.set()  # Sooner than what we're sleeping until
 
-        self._cached.clear()
-        self._buffer = None
-        await self._cached.wait()
-        return await self.get_timer(days=days)
+    async def _load_window(self, now):
+        horizon = now + self.window
+        records = await self.db.fetch("SELECT * FROM timers WHERE expires < $1 ORDER BY expires;", horizon)
+        done = self.wheel.done()  # Fired off the wheel, but maybe not deleted by a checkpoint yet
+        for record in records:
+            if record['id'] not in done:
+                self._push(Timer(record, self))
+        self._horizon = horizon
 
     async def initialize_finished_timer(self, timer):
         if not timer.finished:
@@ -86,53 +248,163 @@ class BotTimerManager:
             timer.finished = True
 
     async def call_timer(self, timer):
-        await self.db.execute("DELETE FROM timers WHERE id=$1", timer.id)
-        await self.initialize_finished_timer(timer)
+        if not self.wheel.cancel(timer):
+            await self.db.execute("DELETE FROM timers WHERE id=$1", timer.id)
+        await self.initialize_finished_timer(timer)  # Its heap entry is skipped once it comes up
+
+    async def _fire_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            timer = heapq.heappop(self._heap)[2]
+            self._queued.discard(timer.id)
+            if not timer.finished:
+                due.append(timer)
+
+        if due:
+            await self.db.execute("DELETE FROM timers WHERE id = ANY($1::bigint[])", [timer.id for timer in due])
+            for timer in due:
+                await self.initialize_finished_timer(timer)
 
     async def dispatch_timers(self):
-        try:
-            while not self.client.is_closed():
-                timer = self._buffer = await self.wait_for_timers(days=40)
-                now = datetime.datetime.utcnow()
+        while not self.client.is_closed():
+            try:
+                await self._dispatch_once()
+            except Exception:
+                log.exception("Dispatching timers failed, retrying in %s seconds", self.retry_after)
+                self._horizon = None  # Reload the window once we're back
+                await asyncio.sleep(self.retry_after)
 
-                if timer.expires >= now:
-                    to_sleep = (timer.expires - now).total_seconds()
-                    await asyncio.sleep(to_sleep)
+    async def _dispatch_once(self):
+        now = datetime.datetime.utcnow()
+        if self._horizon is None or now >= self._horizon:
+            await self._load_window(now)
 
-                await self.call_timer(timer)
-        except asyncio.CancelledError:
-            raise
-        except (OSError, discord.ConnectionClosed, asyncpg.PostgresConnectionError):
-            self.timer_task.cancel()
-            self.timer_task = self.client.loop.create_task(self.dispatch_timers())
+        await self._fire_due(now)
+
+        wake_at = min(self._heap[0][0], self._horizon) if self._heap else self._horizon
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), (wake_at - datetime.datetime.utcnow()).total_seconds())
+        except asyncio.TimeoutError:
+            pass
+
+    @staticmethod
+    def columns(timers):
+        """ The timers as column lists of (event, extra, expires, created, owner_id), for unnest. """
+        return (
+            [timer.event for timer in timers],
+            [dumps({'args': timer.args, 'kwargs': timer.kwargs}) for timer in timers],
+            [timer.expires for timer in timers],
+            [timer.created_at for timer in timers],
+            [timer.owner_id for timer in timers]
+        )
 
-    async def dispatch_short_timer(self, seconds, timer):
-        await asyncio.sleep(seconds)
-        await self.initialize_finished_timer(timer)
+    def _schedule(self, timer):
+        if self._horizon is not None and timer.expires < self._horizon:
+            self._push(timer)
 
     async def create_timer(self, when, event, *args, **kwargs):
         try:
             now = kwargs.pop('created')
         except KeyError:
             now = datetime.datetime.utcnow()
+        owner_id = kwargs.pop('owner_id', None)
 
-        timer = Timer.partial(self, event=event, args=args, kwargs=kwargs, expires=when, created=now)
+        timer = Timer.partial(self, event=event, args=args, kwargs=kwargs, expires=when, created=now, owner_id=owner_id)
         delta = (when - now).total_seconds()
         if delta <= 30:
-            self.client.loop.create_task(self.dispatch_short_timer(delta, timer))
+            self.wheel.add(timer, delta)
             return timer
 
         row = await self.db.fetchrow(
-            "INSERT INTO timers (event, extra, expires, created) VALUES ($1, $2, $3, $4) RETURNING id;",
-            event, dumps({'args': args, 'kwargs': kwargs}), when, now
+            "INSERT INTO timers (event, extra, expires, created, owner_id) VALUES ($1, $2, $3, $4, $5) RETURNING id;",
+            event, dumps({'args': args, 'kwargs': kwargs}), when, now, owner_id
         )
         timer.id = row[0]
+        self._schedule(timer)
+        return timer
 
-        if delta <= (86400 * 40):
-            self._cached.set()
+    async def create_timers(self, many):
+        """ Creates many timers with one INSERT.
 
-        if self._buffer and when < self._buffer.expires:
-            self.timer_task.cancel()
-            self.timer_task = self.client.loop.create_task(self.dispatch_timers())
+            :param many: Dicts with `when` and `event`, and optionally `args`, `kwargs` and `owner_id`.
+            :return: The created timers, in the same order.
+        """
+        now = datetime.datetime.utcnow()
+        timers = [
+            Timer.partial(
+                self, event=entry['event'], args=list(entry.get('args', ())), kwargs=entry.get('kwargs', {}),
+                expires=entry['when'], created=now, owner_id=entry.get('owner_id')
+            )
+            for entry in many
+        ]
 
-        return timer
+        long = []
+        for timer in timers:
+            if (delta := (timer.expires - now).total_seconds()) <= 30:
+                self.wheel.add(timer, delta)
+            else:
+                long.append(timer)
+
+        if long:
+            rows = await self.db.fetch(
+                "INSERT INTO timers (event, extra, expires, created, owner_id) "
+                "SELECT * FROM unnest($1::text[], $2::text[], $3::timestamp[], $4::timestamp[], $5::bigint[]) RETURNING id;",
+                *self.columns(long)
+            )
+            for timer, row in zip(long, rows):
+                timer.id = row['id']
+                self._schedule(timer)
+        return timers
+
+    @staticmethod
+    def _owner_ids(owner_id):
+        return None if owner_id is None else [owner_id] if isinstance(owner_id, int) else list(owner_id)
+
+    def _matches(self, timer, event, owner_ids):
+        return (event is None or timer.event == event) and (owner_ids is None or timer.owner_id in owner_ids)
+
+    async def get_timers(self, *, event=None, owner_id=None):
+        """ Pending timers of an event and/or owner (or several owners), soonest first. """
+        owner_ids = self._owner_ids(owner_id)
+        timers = [
+            Timer(record, self) for record in await self.db.fetch(
+                "SELECT * FROM timers WHERE ($1::text IS NULL OR event = $1) "
+                "AND ($2::bigint[] IS NULL OR owner_id = ANY($2)) ORDER BY expires;",
+                event, owner_ids
+            )
+        ]
+        timers += [
+            timer for timer in self.wheel.timers()
+            if timer.id is None and self._matches(timer, event, owner_ids)  # Not checkpointed yet
+        ]
+        return sorted(timers, key=lambda timer: timer.expires)
+
+    async def cancel_timers(self, *, event=None, owner_id=None):
+        """ Cancels every timer of an event and/or owner (or several owners) without firing them.
+
+            :return: How many were cancelled.
+        """
+        if event is None and owner_id is None:
+            raise ValueError("event or owner_id is required")
+
+        owner_ids = self._owner_ids(owner_id)
+        cancelled = [timer for timer in self.wheel.timers() if self._matches(timer, event, owner_ids)]
+        for timer in cancelled:
+            self.wheel.cancel(timer)
+            timer.finished = True
+
+        records = await self.db.fetch(
+            "DELETE FROM timers WHERE ($1::text IS NULL OR event = $1) "
+            "AND ($2::bigint[] IS NULL OR owner_id = ANY($2)) RETURNING id;",
+            event, owner_ids
+        )
+        ids = {record['id'] for record in records}
+        for _, _id, timer in self._heap:
+            if _id in ids:
+                timer.finished = True  # Skipped once it comes up
+        return len(cancelled) + len(ids - {timer.id for timer in cancelled})
+
+    async def close(self):
+        self.timer_task.cancel()
+        await self.wheel.close()
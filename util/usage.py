@@ -0,0 +1,145 @@
+from util.loops import run_every
+
+
+class CommandUsage:
+    """ Counts command uses per command, guild and minute.
+
+        Uses are counted in memory and added onto the command_usage table in batches,
+        so running a command never costs a write of its own. All-time counts are kept
+        in command_usage_totals alongside. Past a day, minute buckets are rolled up into
+        hours, and past a month into days; anything older than `retention` is deleted.
+    """
+
+    ROLLUPS = ((86400, 3600), (30 * 86400, 86400))  # (age, bucket size)
+
+    def __init__(self, db, *, bucket=60, flush_interval=60, rollup_interval=3600, retention=365 * 86400):
+        self.db = db
+        self.bucket = bucket
+        self.flush_interval = flush_interval
+        self.rollup_interval = rollup_interval
+        self.retention = retention
+        self._pending = {}  # (bucket, command, guild_id) -> uses
+        self._flushing = {}  # Same, for the batch being written right now
+        self._tasks = []
+
+    def __repr__(self):
+        return f'<CommandUsage pending={len(self._pending)}>'
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                self.db.bot.loop.create_task(run_every(self.flush_interval, self.flush, name="Command usage flush")),
+                self.db.bot.loop.create_task(run_every(self.rollup_interval, self.roll_up, name="Command usage rollup"))
+            ]
+
+    def record(self, command, guild_id=None):
+        bucket = int(self.db.bot.unix) // self.bucket * self.bucket
+        key = bucket, command, guild_id or 0
+        self._pending[key] = self._pending.get(key, 0) + 1
+
+    async def flush(self):
+        if not self._pending:
+            return
+
+        pending = self._flushing = self._pending
+        self._pending = {}
+        try:
+            await self.db.execute("""
+            WITH batch AS (
+                SELECT * FROM unnest($1::bigint[], $2::text[], $3::bigint[], $4::bigint[]) AS b(bucket, command, guild_id, uses)
+            ), buckets AS (
+                INSERT INTO command_usage (bucket, command, guild_id, uses) SELECT * FROM batch
+                ON CONFLICT (bucket, command, guild_id) DO UPDATE SET uses=command_usage.uses+EXCLUDED.uses
+            )
+            INSERT INTO command_usage_totals (command, guild_id, uses)
+            SELECT command, guild_id, sum(uses) FROM batch GROUP BY command, guild_id
+            ON CONFLICT (command, guild_id) DO UPDATE SET uses=command_usage_totals.uses+EXCLUDED.uses
+            """, *map(list, zip(*((*key, uses) for key, uses in pending.items()))))
+        except Exception:
+            for key, uses in pending.items():
+                self._pending[key] = self._pending.get(key, 0) + uses
+            raise
+        finally:
+            self._flushing = {}
+
+    async def roll_up(self):
+        """ Merges old buckets into coarser ones and deletes the ones past retention. """
+        now = int(self.db.bot.unix)
+        for age, size in self.ROLLUPS:
+            await self.db.execute("""
+            WITH moved AS (
+                DELETE FROM command_usage WHERE bucket < $1 AND bucket % $2 <> 0
+                RETURNING bucket, command, guild_id, uses
+            )
+            INSERT INTO command_usage (bucket, command, guild_id, uses)
+            SELECT bucket - bucket % $2, command, guild_id, sum(uses) FROM moved GROUP BY 1, 2, 3
+            ON CONFLICT (bucket, command, guild_id) DO UPDATE SET uses=command_usage.uses+EXCLUDED.uses
+            """, now - age, size)
+        await self.db.execute("DELETE FROM command_usage WHERE bucket < $1", now - self.retention)
+
+    def _pending_in(self, since, until, guild_id):
+        for (bucket, command, _guild_id), uses in (*self._flushing.items(), *self._pending.items()):
+            if (
+                (since is None or bucket >= since) and
+                (until is None or bucket < until) and
+                (guild_id is None or _guild_id == guild_id)
+            ):
+                yield bucket, command, uses
+
+    async def usage(self, *, since=None, until=None, guild_id=None):
+        """ Uses of each command in [since, until), most used first.
+
+            Buckets older than a day are hourly and older than a month daily,
+            so windows reaching that far back are rounded to those.
+
+            :param since: Unix time to count from, or None for all time.
+            :param until: Unix time to count up to, or None for now.
+            :param guild_id: Only count uses in this guild.
+            :return: A list of (command, uses) pairs.
+        """
+        since = since and int(since) // self.bucket * self.bucket
+        if since is None and until is None:
+            records = await self.db.fetch("""
+            SELECT command, sum(uses)::bigint AS uses FROM command_usage_totals
+            WHERE ($1::bigint IS NULL OR guild_id = $1) GROUP BY command
+            """, guild_id)
+        else:
+            records = await self.db.fetch("""
+            SELECT command, sum(uses)::bigint AS uses FROM command_usage
+            WHERE ($1::bigint IS NULL OR bucket >= $1) AND ($2::bigint IS NULL OR bucket < $2)
+            AND ($3::bigint IS NULL OR guild_id = $3)
+            GROUP BY command
+            """, since, until and int(until), guild_id)
+
+        totals = {record['command']: record['uses'] for record in records}
+        for _, command, uses in self._pending_in(since, until, guild_id):
+            totals[command] = totals.get(command, 0) + uses
+
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+    async def series(self, *, since, step=3600, command=None, guild_id=None):
+        """ Uses per `step` seconds since the given unix time, for capacity planning.
+
+            :return: A list of (bucket start, uses) pairs in ascending order.
+        """
+        since = int(since) // step * step
+        totals = {
+            record['start']: record['uses']
+            for record in await self.db.fetch("""
+            SELECT bucket - bucket % $2 AS start, sum(uses)::bigint AS uses FROM command_usage
+            WHERE bucket >= $1 AND ($3::text IS NULL OR command = $3) AND ($4::bigint IS NULL OR guild_id = $4)
+            GROUP BY start
+            """, since, step, command, guild_id)
+        }
+        for bucket, _command, uses in self._pending_in(since, None, guild_id):
+            if command is None or _command == command:
+                start = bucket - bucket % step
+                totals[start] = totals.get(start, 0) + uses
+
+        return sorted(totals.items())
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        await self.flush()
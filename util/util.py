@@ -131,12 +131,10 @@ def human_readable(iterable):
 
 
 async def get_shrimp_ranking(db, user):
-    # might remove if the bot gets too popular (in which it won't)
-    rank = await db.fetch('SELECT user_id, RANK () OVER (ORDER BY shrimp + vault DESC) rank FROM users')
-    rank = list(filter(lambda r: r['user_id'] == user.id, rank))
-    if len(rank) <= 0:
+    rank = db.ranks.rank(user.id)
+    if rank is None:
         return "Unranked"
-    return "Rank #{:,}".format(rank[0]['rank'])
+    return "Rank #{:,}".format(rank)
 
 
 def random(minimum=None, maximum=None):